@@ -1,9 +1,9 @@
-import sqlite3
 import pandas as pd
+from nfldata.common.sqlite import checkpoint, connect
 
 
 def import_elevations_csv():
-    database = sqlite3.connect('nfldata.sqlite')
+    database = connect('bulk_load')
 
     database.execute('DROP TABLE IF EXISTS city_elevations')
     database.execute('''
@@ -31,6 +31,7 @@ def import_elevations_csv():
         ''', (row['city'], row['state'], row['elevation']))
 
     database.commit()
+    checkpoint(database, 'TRUNCATE')
     database.close()
 
 
@@ -0,0 +1,33 @@
+"""Expires, evicts and compacts the responses cached by
+nfldata.common.httpcache.SqliteCacheStorage."""
+import argparse
+import os
+from scrapy.utils.project import data_path
+from nfldata.common.httpcache import (HTTPCACHE_DATABASE, compact_cache,
+                                      evict_responses, expire_responses,
+                                      open_cache)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='expire, evict and compact the HTTP cache')
+    parser.add_argument('--cache',
+                        default=os.path.join(data_path('httpcache'),
+                                             HTTPCACHE_DATABASE))
+    parser.add_argument('--expiration-secs',
+                        type=int,
+                        default=0,
+                        help='delete responses stored longer ago than this')
+    parser.add_argument('--max-size',
+                        type=int,
+                        default=0,
+                        help='evict responses until the cache is this size')
+    args = parser.parse_args()
+
+    database = open_cache(args.cache)
+    expired = expire_responses(database, args.expiration_secs)
+    evicted = evict_responses(database, args.max_size)
+    size = os.path.getsize(args.cache)
+    compact_cache(database)
+    database.close()
+    print(f'Expired {expired} and evicted {evicted} responses, and compacted '
+          f'{args.cache} from {size} to {os.path.getsize(args.cache)} bytes')
@@ -0,0 +1,43 @@
+"""Reports the indexes declared by the items in nfldata.items that are missing
+from the database."""
+import argparse
+from nfldata.common.sqlite import (DATABASE_PATH, connect, create_indexes,
+                                   index_name, missing_indexes, table_exists)
+from nfldata.items import sql_item_classes
+
+
+def find_missing_indexes(database):
+    """Returns a list of (item class, columns) for each declared index that is
+    missing from the given database. Tables that do not exist yet are
+    skipped."""
+
+    missing = []
+    for item_class in sql_item_classes():
+        indexes = getattr(item_class, 'sql_indexes', ())
+        if not indexes or not table_exists(database, item_class.sql_table):
+            continue
+        missing.extend((item_class, columns) for columns in missing_indexes(
+            database, item_class.sql_table, indexes))
+    return missing
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='report declared indexes missing from the database')
+    parser.add_argument('--database', default=DATABASE_PATH)
+    parser.add_argument('--create',
+                        default=False,
+                        action=argparse.BooleanOptionalAction,
+                        help='create the missing indexes')
+    args = parser.parse_args()
+
+    database = connect('bulk_load' if args.create else 'read_heavy',
+                       path=args.database)
+    for item_class, columns in find_missing_indexes(database):
+        print('{}: {} ({})'.format(item_class.sql_table,
+                                   index_name(item_class.sql_table, columns),
+                                   ', '.join(columns)))
+        if args.create:
+            create_indexes(database, item_class.sql_table, [columns])
+    database.commit()
+    database.close()
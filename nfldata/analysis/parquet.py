@@ -0,0 +1,26 @@
+"""Exports the tables in the database to Parquet, so that the notebooks can
+load only the columns and seasons they need with pandas.read_parquet."""
+import argparse
+from nfldata.common.parquet import EXPORT_DIRECTORY, export_table
+from nfldata.common.sqlite import DATABASE_PATH, connect, table_exists
+from nfldata.items import sql_item_classes
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='export the tables in the database to Parquet')
+    parser.add_argument('--database', default=DATABASE_PATH)
+    parser.add_argument('--directory', default=EXPORT_DIRECTORY)
+    parser.add_argument('tables',
+                        nargs='*',
+                        help='the tables to export, or all of them if none')
+    args = parser.parse_args()
+
+    database = connect('read_heavy', path=args.database)
+    for item_class in sql_item_classes():
+        if args.tables and item_class.sql_table not in args.tables:
+            continue
+        if not table_exists(database, item_class.sql_table):
+            continue
+        rows = export_table(database, item_class, args.directory)
+        print(f'{item_class.sql_table}: {rows} rows')
+    database.close()
@@ -0,0 +1,154 @@
+"""Runs a spider's callbacks over the responses it has cached, and sends the
+items they produce through the item pipelines, without fetching anything.
+
+This rebuilds a spider's tables after a parser fix. The cached responses are
+parsed in a pool of processes, and any requests the callbacks produce are
+ignored, since their responses are replayed on their own."""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import zlib
+from scrapy import signals
+from scrapy.crawler import Crawler
+from scrapy.exceptions import DropItem
+from scrapy.http import Headers, HtmlResponse, Request
+from scrapy.pipelines import ItemPipelineManager
+from scrapy.responsetypes import responsetypes
+from scrapy.spiderloader import SpiderLoader
+from scrapy.utils.misc import load_object
+from scrapy.utils.project import data_path, get_project_settings
+from scrapy.utils.spider import iterate_spider_output
+from twisted.python.failure import Failure
+from w3lib.http import headers_raw_to_dict
+from nfldata.common.httpcache import (HTTPCACHE_DATABASE, cached_responses,
+                                      open_cache)
+from nfldata.common.pfr import uncomment_hidden_tables
+
+# The spider that the callbacks are run on in each worker process.
+_spider = None
+
+
+def _init_worker(spidercls, spider_kwargs):
+    global _spider  # pylint: disable=global-statement
+    _spider = spidercls(**spider_kwargs)
+
+
+def parse_cached_response(cached_response):
+    """Runs the callback of a single cached response, and returns the items it
+    produces."""
+
+    name, url, meta, status, raw_headers, body = cached_response
+    meta = json.loads(meta)
+    headers = Headers(headers_raw_to_dict(raw_headers))
+    body = zlib.decompress(body)
+    rendered = _rendered_page(headers, body)
+    if rendered is not None:
+        # Pages rendered with a render profile are cached as the JSON that the
+        # Splash script returned, which SplashMiddleware unwraps in a crawl.
+        response = HtmlResponse(url=rendered.get('url', url),
+                                status=rendered.get('http_status', status),
+                                body=rendered['html'],
+                                encoding='utf-8',
+                                request=Request(url, meta=meta))
+    else:
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        response = respcls(url=url,
+                           status=status,
+                           headers=headers,
+                           body=body,
+                           request=Request(url, meta=meta))
+    if meta.get('pfr_direct'):
+        html, _ = uncomment_hidden_tables(response.text)
+        response = response.replace(body=html)
+
+    if '.' in name:
+        callback = load_object(name)
+    else:
+        callback = getattr(_spider, name)
+    return [
+        result for result in iterate_spider_output(callback(response))
+        if not isinstance(result, Request)
+    ]
+
+
+def _rendered_page(headers, body):
+    """Returns the html, url and http_status returned by a Splash script, or
+    None if the body is not a JSON object with an html key."""
+
+    content_type = headers.get('Content-Type', b'').decode('latin-1')
+    if 'json' not in content_type:
+        return None
+    try:
+        rendered = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(rendered, dict) or 'html' not in rendered:
+        return None
+    return rendered
+
+
+def _wait(deferred):
+    """Returns the result of a deferred that has already fired, raising its
+    error if it failed."""
+
+    results = []
+    deferred.addBoth(results.append)
+    if isinstance(results[0], Failure):
+        results[0].raiseException()
+    return results[0]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='rerun a spider over its cached responses')
+    parser.add_argument('spider')
+    parser.add_argument('--cache',
+                        default=os.path.join(data_path('httpcache'),
+                                             HTTPCACHE_DATABASE))
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('-a',
+                        dest='spider_arguments',
+                        action='append',
+                        default=[],
+                        metavar='NAME=VALUE',
+                        help='set a spider argument')
+    args = parser.parse_args()
+    spider_kwargs = dict(a.split('=', 1) for a in args.spider_arguments)
+
+    settings = get_project_settings()
+    # Nothing runs the reactor, so items must never be held back.
+    settings.set('SQLITE_WRITER_THREAD_ENABLED', False)
+    logging.basicConfig(level=logging.INFO)
+
+    spidercls = SpiderLoader.from_settings(settings).load(args.spider)
+    crawler = Crawler(spidercls, settings)
+    spider = spidercls.from_crawler(crawler, **spider_kwargs)
+    pipelines = ItemPipelineManager.from_crawler(crawler)
+    _wait(pipelines.open_spider(spider))
+
+    # The pool reads the cached responses from its own thread.
+    cache = open_cache(args.cache, check_same_thread=False)
+    items = 0
+    with multiprocessing.Pool(args.processes,
+                              initializer=_init_worker,
+                              initargs=(spidercls, spider_kwargs)) as pool:
+        for results in pool.imap(parse_cached_response,
+                                 cached_responses(cache, spider.name),
+                                 chunksize=16):
+            for item in results:
+                try:
+                    _wait(pipelines.process_item(item, spider))
+                except DropItem as error:
+                    logging.warning('Dropped %s: %s', item, error)
+                items += 1
+    cache.close()
+
+    _wait(pipelines.close_spider(spider))
+    # SqlitePipeline only swaps in its staging tables once the spider has
+    # finished.
+    crawler.signals.send_catch_log(signal=signals.spider_closed,
+                                   spider=spider,
+                                   reason='finished')
+    logging.info('Reparsed %d items for %s', items, spider.name)
@@ -0,0 +1,47 @@
+"""Loads spools written by nfldata.pipelines.spool.SpoolPipeline into the
+database. Rows are upserted by primary key, so replaying a spool more than once
+leaves the database unchanged."""
+import argparse
+import collections
+from nfldata.common.spool import read_spool
+from nfldata.common.sqlite import DATABASE_PATH, connect
+from nfldata.items import sql_item_classes
+from nfldata.pipelines.sqlite import SqliteWriter
+
+
+def replay_spool(writer, path, item_classes):
+    """Writes every row in the spool at the given path with the writer, and
+    returns the number of rows read for each table. item_classes maps each
+    table to its item class, and the tables are created as needed."""
+
+    rows = collections.Counter()
+    for table, row in read_spool(path):
+        item_class = item_classes[table]
+        if table not in rows:
+            item_class.sql_create(writer.database)
+        writer.write(item_class, tuple(row))
+        rows[table] += 1
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='load spooled items into the database')
+    parser.add_argument('--database', default=DATABASE_PATH)
+    parser.add_argument('spools', nargs='+', help='the spool files to load')
+    args = parser.parse_args()
+
+    writer = SqliteWriter(connect('bulk_load', path=args.database),
+                          batch_size=500,
+                          commit_rows=10000,
+                          commit_interval=60,
+                          skip_unchanged_rows=True,
+                          run_name='replay')
+    item_classes = {
+        item_class.sql_table: item_class for item_class in sql_item_classes()
+    }
+    for spool in args.spools:
+        for table, count in sorted(
+                replay_spool(writer, spool, item_classes).items()):
+            print(f'{spool}: {table}: {count} rows')
+    writer.close()
@@ -0,0 +1,159 @@
+"""Builds a compact copy of the database with integer keys and enum codes.
+
+In the v2 schema, every link to Pro Football Reference is interned into the
+links table and stored as its integer id, and every enum is stored as its
+integer value, with a lookup table per Enum class. Each table is stored as
+<table>_v2, WITHOUT ROWID where it has a composite primary key, and a view with
+the original table name joins the ids and codes back to text, so that existing
+queries keep working. The v2 database is read only, and is rebuilt from the
+database that the spiders write to."""
+import argparse
+import os
+import re
+from nfldata.common.sqlite import (DATABASE_PATH, checkpoint, connect,
+                                   create_indexes, primary_key_columns,
+                                   table_exists)
+from nfldata.items import sql_item_classes
+
+V2_DATABASE_PATH = 'nfldata-v2.sqlite'
+
+
+def build_v2_database(source=DATABASE_PATH, destination=V2_DATABASE_PATH):
+    """Builds the v2 database at destination from the tables in source,
+    replacing any database already at destination."""
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(destination + suffix):
+            os.remove(destination + suffix)
+
+    database = connect('bulk_load', path=destination)
+    database.execute('ATTACH DATABASE ? AS source', (source,))
+    database.execute('''
+        CREATE TABLE links (
+            link_id INTEGER PRIMARY KEY,
+            link TEXT NOT NULL UNIQUE
+        )
+    ''')
+
+    item_classes = [
+        item_class for item_class in sql_item_classes()
+        if table_exists(database, item_class.sql_table, schema='source')
+    ]
+    for item_class in item_classes:
+        for column in getattr(item_class, 'sql_links', ()):
+            database.execute(f'''
+                INSERT OR IGNORE INTO links (link)
+                SELECT {column} FROM source.{item_class.sql_table}
+                WHERE {column} IS NOT NULL
+            ''')
+
+    enum_classes = {
+        enum_class for item_class in item_classes
+        for enum_class in getattr(item_class, 'sql_enums', {}).values()
+    }
+    for enum_class in enum_classes:
+        _create_enum_table(database, enum_class)
+
+    for item_class in item_classes:
+        _create_v2_table(database, item_class)
+    database.commit()
+
+    database.execute('DETACH DATABASE source')
+    checkpoint(database, 'TRUNCATE')
+    database.execute('VACUUM')
+    database.close()
+
+
+def enum_table(enum_class):
+    """Returns the name of the lookup table for the codes of the given Enum
+    class, e.g. injury_status_codes for InjuryStatus."""
+
+    words = re.sub(r'(?<!^)(?=[A-Z])', '_', enum_class.__name__).lower()
+    return f'{words}_codes'
+
+
+def _create_enum_table(database, enum_class):
+    table = enum_table(enum_class)
+    database.execute(f'''
+        CREATE TABLE {table} (
+            code INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    ''')
+    database.executemany(f'INSERT INTO {table} (code, name) VALUES (?, ?)',
+                         [(member.value, member.name) for member in enum_class])
+
+
+def _create_v2_table(database, item_class):
+    table = item_class.sql_table
+    v2_table = f'{table}_v2'
+    links = getattr(item_class, 'sql_links', ())
+    enums = getattr(item_class, 'sql_enums', {})
+    types = {
+        name: column_type for _, name, column_type, _, _, _ in database.execute(
+            f'PRAGMA source.table_info({table})')
+    }
+    key = primary_key_columns(database, table, schema='source')
+
+    definitions = []
+    for column in item_class.sql_columns:
+        if column in links or column in enums:
+            column_type = 'INTEGER'
+        else:
+            column_type = types[column]
+        if key == (column,) and column_type == 'INTEGER':
+            definitions.append(f'{column} INTEGER PRIMARY KEY')
+        else:
+            definitions.append(f'{column} {column_type}')
+    if len(key) > 1:
+        definitions.append('PRIMARY KEY ({})'.format(', '.join(key)))
+
+    # WITHOUT ROWID tables need a primary key with no NULLs.
+    without_rowid = len(key) > 1 and not database.execute(
+        'SELECT 1 FROM source.{} WHERE {} LIMIT 1'.format(
+            table, ' OR '.join(f'{c} IS NULL' for c in key))).fetchone()
+    database.execute('CREATE TABLE {} ({}){}'.format(
+        v2_table, ', '.join(definitions),
+        ' WITHOUT ROWID' if without_rowid else ''))
+
+    # Copy the rows, looking up the id of each link and the code of each enum,
+    # and create a view that looks them back up.
+    stored, stored_joins = [], []
+    restored, restored_joins = [], []
+    for column in item_class.sql_columns:
+        if column in links:
+            lookup = f'links AS {column}_link'
+            stored.append(f'{column}_link.link_id')
+            stored_joins.append(
+                f'LEFT JOIN {lookup} ON {column}_link.link = original.{column}')
+            restored.append(f'{column}_link.link AS {column}')
+            restored_joins.append(f'LEFT JOIN {lookup} '
+                                  f'ON {column}_link.link_id = stored.{column}')
+        elif column in enums:
+            lookup = f'{enum_table(enums[column])} AS {column}_code'
+            stored.append(f'{column}_code.code')
+            stored_joins.append(
+                f'LEFT JOIN {lookup} ON {column}_code.name = original.{column}')
+            restored.append(f'{column}_code.name AS {column}')
+            restored_joins.append(
+                f'LEFT JOIN {lookup} ON {column}_code.code = stored.{column}')
+        else:
+            stored.append(f'original.{column}')
+            restored.append(f'stored.{column}')
+
+    database.execute(
+        'INSERT OR REPLACE INTO {} ({}) SELECT {} FROM source.{} AS original {}'
+        .format(v2_table, ', '.join(item_class.sql_columns), ', '.join(stored),
+                table, ' '.join(stored_joins)))
+    database.execute('CREATE VIEW {} AS SELECT {} FROM {} AS stored {}'.format(
+        table, ', '.join(restored), v2_table, ' '.join(restored_joins)))
+    create_indexes(database, v2_table, getattr(item_class, 'sql_indexes', ()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='build a compact copy of the database')
+    parser.add_argument('--source', default=DATABASE_PATH)
+    parser.add_argument('--destination', default=V2_DATABASE_PATH)
+    args = parser.parse_args()
+    build_v2_database(args.source, args.destination)
@@ -9,6 +9,6 @@ def print_schema(database, table_name):
     [schema] = database.execute(
         '''
         SELECT sql FROM sqlite_master
-        WHERE type='table' AND name = ?
+        WHERE type IN ('table', 'view') AND name = ?
     ''', [table_name]).fetchone()
     print(schema)
@@ -1,12 +1,11 @@
-import sqlite3
-
+from nfldata.common.sqlite import connect
 from nfldata.items.coaches import Coach, CoachingPosition, CoachingStaffMember
 
 
 class CoachesDao:
 
     def __init__(self):
-        self.database = sqlite3.connect('nfldata.sqlite')
+        self.database = connect('read_heavy')
 
     def lookup_coaches(self, query=None, limit=None):
         '''
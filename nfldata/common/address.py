@@ -1,14 +1,31 @@
 import us
 import usaddress
+from nfldata.common.sqlite import connect, table_exists
 
 CITY_NAME_SUBSTITUTIONS = {
     'foxborough': 'foxboro',
     'philadephia': 'philadelphia'
 }
 
+# The table that normalized addresses are remembered in between crawls.
+ADDRESS_CACHE_TABLE = 'address_cache'
+
 
 def parse_address(address):
-    address = {key: value for value, key in usaddress.parse_address(address)}
+    """Parses the city and state out of the given address. The results are
+    remembered for the rest of the process."""
+
+    return _DEFAULT_NORMALIZER.normalize(address)
+
+
+def tag_address(address):
+    """Parses the city and state out of the given address with usaddress,
+    without any caching."""
+
+    tags = {}
+    for value, key in usaddress.parse(address):
+        tags.setdefault(key, []).append(value.rstrip(','))
+    address = {key: ' '.join(values) for key, values in tags.items()}
     city = address['PlaceName'] if 'PlaceName' in address else None
     city = CITY_NAME_SUBSTITUTIONS[
         city] if city in CITY_NAME_SUBSTITUTIONS else city
@@ -28,8 +45,103 @@ def normalize_state(state):
         raise ValueError(f'Invalid state: {state}')
 
 
+class AddressNormalizer:
+    """Parses addresses into a city and state, tagging each distinct address
+    only once.
+
+    If a database path is given, the addresses already in its address_cache
+    table are loaded, and save stores the new ones there, so that later crawls
+    do not tag them again. Spiders save once they have closed, so that they do
+    not write to the database while SqlitePipeline holds a transaction open.
+    hits and misses count the addresses that were and were not already
+    known."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.addresses = {}
+        # The addresses tagged since the last save.
+        self.unsaved = {}
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            self._load()
+
+    def normalize(self, address):
+        """Returns the city and state of a single address."""
+
+        [result] = self.normalize_many([address])
+        return result
+
+    def normalize_many(self, addresses):
+        """Returns the city and state of each of the given addresses, in order.
+        The addresses that are not known yet are tagged."""
+
+        new_addresses = {}
+        for address in addresses:
+            key = address.strip()
+            if key in self.addresses or key in new_addresses:
+                self.hits += 1
+            else:
+                self.misses += 1
+                new_addresses[key] = tag_address(key)
+        self.addresses.update(new_addresses)
+        self.unsaved.update(new_addresses)
+        return [self.addresses[address.strip()] for address in addresses]
+
+    def record_stats(self, stats, prefix='address/cache'):
+        """Records the hits, misses and hit rate of this normalizer."""
+
+        stats.set_value(f'{prefix}/hits', self.hits)
+        stats.set_value(f'{prefix}/misses', self.misses)
+        if self.hits + self.misses:
+            stats.set_value(f'{prefix}/hit_rate',
+                            self.hits / (self.hits + self.misses))
+
+    def _load(self):
+        database = connect('read_heavy', path=self.path)
+        try:
+            if not table_exists(database, ADDRESS_CACHE_TABLE):
+                return
+            for address, city, state in database.execute(
+                    f'SELECT address, city, state FROM {ADDRESS_CACHE_TABLE}'):
+                self.addresses[address] = _Address(city=city, state=state)
+        finally:
+            database.close()
+
+    def save(self):
+        """Stores the addresses tagged since the last save in the database, if
+        a path was given."""
+
+        if self.path is None or not self.unsaved:
+            return
+        self._store(self.unsaved)
+        self.unsaved = {}
+
+    def _store(self, addresses):
+        database = connect('read_heavy', path=self.path)
+        try:
+            database.execute(f'''
+                CREATE TABLE IF NOT EXISTS {ADDRESS_CACHE_TABLE} (
+                    address TEXT PRIMARY KEY,
+                    city TEXT,
+                    state TEXT
+                )
+            ''')
+            database.executemany(
+                f'INSERT OR REPLACE INTO {ADDRESS_CACHE_TABLE} VALUES (?, ?, ?)',
+                [(address, result.city, result.state)
+                 for address, result in addresses.items()])
+            database.commit()
+        finally:
+            database.close()
+
+
 class _Address:
 
     def __init__(self, city, state):
         self.city = city
         self.state = state
+
+
+# The normalizer used by parse_address, which is not stored in a database.
+_DEFAULT_NORMALIZER = AddressNormalizer()
@@ -0,0 +1,238 @@
+"""Defines a Splash-aware dupefilter that keeps the fingerprints of the requests
+it has seen on disk instead of in memory."""
+import logging
+import math
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from scrapy.dupefilters import BaseDupeFilter
+from scrapy.utils.job import job_dir
+from scrapy.utils.request import referer_str
+from nfldata.common.httpcache import cache_fingerprint
+from nfldata.common.sqlite import checkpoint, connect
+
+# The files under JOBDIR that the Bloom filter and the exact fingerprints are
+# kept in.
+BLOOM_FILTER_FILE = 'requests.bloom'
+FINGERPRINTS_DATABASE = 'requests.seen.sqlite'
+
+# The start of a Bloom filter file, followed by its number of bits, number of
+# hashes and number of fingerprints added.
+_BLOOM_MAGIC = b'NFLBLOOM'
+_BLOOM_HEADER = struct.Struct('<8sQQQ')
+
+# Write the new fingerprints to the exact store after this many have been
+# added.
+_FLUSH_FINGERPRINTS = 1000
+
+
+class BloomFilter:
+    """A Bloom filter of request fingerprints in a memory-mapped file, so that
+    it uses the same amount of memory however many requests are added, and the
+    operating system can page it out.
+
+    The file is created with enough bits for capacity fingerprints at the given
+    error rate. An existing file keeps the size it was created with."""
+
+    def __init__(self, path, capacity, error_rate):
+        if not os.path.exists(path):
+            bits = math.ceil(-capacity * math.log(error_rate) / math.log(2)**2)
+            hashes = max(1, round(bits / capacity * math.log(2)))
+            with open(path, 'wb') as bloom_file:
+                bloom_file.write(
+                    _BLOOM_HEADER.pack(_BLOOM_MAGIC, bits, hashes, 0))
+                bloom_file.truncate(_BLOOM_HEADER.size + math.ceil(bits / 8))
+
+        self.file = open(path, 'r+b')
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        magic, self.bits, self.hashes, self.count = _BLOOM_HEADER.unpack_from(
+            self.map)
+        if magic != _BLOOM_MAGIC:
+            raise ValueError(f'Not a Bloom filter: {path}')
+        self.capacity = capacity
+
+    def add(self, fingerprint):
+        """Adds the given hexadecimal fingerprint, and returns whether it may
+        have been added before. Only the fingerprints that were not are
+        counted."""
+
+        present = True
+        for position in self._positions(fingerprint):
+            index = _BLOOM_HEADER.size + position // 8
+            mask = 1 << position % 8
+            if not self.map[index] & mask:
+                present = False
+                self.map[index] |= mask
+        if not present:
+            self.count += 1
+        return present
+
+    def expected_error_rate(self):
+        """Returns the chance that a new fingerprint is reported as added before,
+        given how many fingerprints the filter holds."""
+
+        return (1 -
+                math.exp(-self.hashes * self.count / self.bits))**self.hashes
+
+    def close(self):
+        """Saves the number of fingerprints, and closes the file."""
+
+        _BLOOM_HEADER.pack_into(self.map, 0, _BLOOM_MAGIC, self.bits,
+                                self.hashes, self.count)
+        self.map.flush()
+        self.map.close()
+        self.file.close()
+
+    def _positions(self, fingerprint):
+        # Double hashing with two independent halves of the SHA1 fingerprint.
+        first = int(fingerprint[:16], 16)
+        second = int(fingerprint[16:32], 16) | 1
+        return ((first + i * second) % self.bits for i in range(self.hashes))
+
+
+class BloomDupeFilter(BaseDupeFilter):
+    """Filters duplicate requests by their Splash-aware fingerprint, like
+    scrapy_splash.SplashAwareDupeFilter, without holding every fingerprint in
+    memory.
+
+    Each fingerprint is first checked against a memory-mapped Bloom filter
+    sized by DUPEFILTER_BLOOM_CAPACITY and DUPEFILTER_BLOOM_ERROR_RATE. Only
+    the fingerprints that it may have seen are looked up in an exact SQLite
+    store, so no request is ever wrongly filtered. Both are kept in JOBDIR and
+    are reused when the crawl is resumed; without JOBDIR they are deleted when
+    the crawl ends.
+
+    The fingerprints that the Bloom filter wrongly reported as seen are counted
+    in the dupefilter/bloom stats."""
+
+    def __init__(self,
+                 path=None,
+                 debug=False,
+                 capacity=10000000,
+                 error_rate=0.001,
+                 splash_url='http://127.0.0.1:8050',
+                 stats=None):
+        self.temporary = path is None
+        if self.temporary:
+            path = tempfile.mkdtemp(prefix='dupefilter-')
+        self.path = path
+        self.debug = debug
+        self.logdupes = True
+        self.splash_url = splash_url
+        self.stats = stats
+        self.logger = logging.getLogger(__name__)
+        self.bloom = BloomFilter(os.path.join(self.path, BLOOM_FILTER_FILE),
+                                 capacity, error_rate)
+        self.database = connect('bulk_load',
+                                path=os.path.join(self.path,
+                                                  FINGERPRINTS_DATABASE))
+        self.database.execute('''
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                fingerprint BLOB PRIMARY KEY
+            ) WITHOUT ROWID
+        ''')
+        # The fingerprints added since the exact store was last written to.
+        self.unflushed = set()
+        self.added = 0
+        self.false_positives = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Creates the dupefilter from the settings of the crawler."""
+
+        settings = crawler.settings
+        return cls(job_dir(settings),
+                   debug=settings.getbool('DUPEFILTER_DEBUG'),
+                   capacity=settings.getint('DUPEFILTER_BLOOM_CAPACITY',
+                                            10000000),
+                   error_rate=settings.getfloat('DUPEFILTER_BLOOM_ERROR_RATE',
+                                                0.001),
+                   splash_url=settings.get('SPLASH_URL',
+                                           'http://127.0.0.1:8050'),
+                   stats=crawler.stats)
+
+    def request_seen(self, request):
+        """Returns whether a request with the same fingerprint was seen before,
+        and remembers it otherwise."""
+
+        fingerprint = cache_fingerprint(request, self.splash_url)
+        if self.bloom.add(fingerprint):
+            if fingerprint in self.unflushed or self._stored(fingerprint):
+                return True
+            self.false_positives += 1
+            self.bloom.count += 1
+        if self.bloom.count == self.bloom.capacity + 1:
+            self.logger.warning(
+                'The dupefilter has seen more than %d requests, so it will '
+                'look up more of them on disk. Raise '
+                'DUPEFILTER_BLOOM_CAPACITY for crawls this large.',
+                self.bloom.capacity)
+
+        self.added += 1
+        self.unflushed.add(fingerprint)
+        if len(self.unflushed) >= _FLUSH_FINGERPRINTS:
+            self._flush()
+        return False
+
+    def close(self, reason):  # pylint: disable=unused-argument
+        """Writes the remaining fingerprints, records the stats and closes the
+        files."""
+
+        self._flush()
+        if self.stats:
+            self.record_stats(self.stats)
+        self.logger.info(
+            'Dupefilter added %d requests, of which %d were false positives '
+            'of the Bloom filter', self.added, self.false_positives)
+        checkpoint(self.database, 'TRUNCATE')
+        self.database.close()
+        self.bloom.close()
+        if self.temporary:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def record_stats(self, stats, prefix='dupefilter/bloom'):
+        """Records how many requests were added, and how many of them the Bloom
+        filter wrongly reported as seen."""
+
+        stats.set_value(f'{prefix}/added', self.added)
+        stats.set_value(f'{prefix}/false_positives', self.false_positives)
+        if self.added:
+            stats.set_value(f'{prefix}/false_positive_rate',
+                            self.false_positives / self.added)
+        stats.set_value(f'{prefix}/expected_false_positive_rate',
+                        self.bloom.expected_error_rate())
+
+    def log(self, request, spider):
+        """Logs a filtered request, the same as RFPDupeFilter."""
+
+        if self.debug:
+            msg = 'Filtered duplicate request: %(request)s (referer: %(referer)s)'
+            args = {'request': request, 'referer': referer_str(request)}
+            self.logger.debug(msg, args, extra={'spider': spider})
+        elif self.logdupes:
+            msg = ('Filtered duplicate request: %(request)s'
+                   ' - no more duplicates will be shown'
+                   ' (see DUPEFILTER_DEBUG to show all duplicates)')
+            self.logger.debug(msg, {'request': request},
+                              extra={'spider': spider})
+            self.logdupes = False
+        spider.crawler.stats.inc_value('dupefilter/filtered', spider=spider)
+
+    def _stored(self, fingerprint):
+        return self.database.execute(
+            'SELECT 1 FROM fingerprints WHERE fingerprint = ?',
+            (bytes.fromhex(fingerprint),)).fetchone() is not None
+
+    def _flush(self):
+        if not self.unflushed:
+            return
+        self.database.executemany(
+            'INSERT OR IGNORE INTO fingerprints VALUES (?)',
+            [(bytes.fromhex(fingerprint),) for fingerprint in self.unflushed])
+        self.database.commit()
+        # The bulk_load profile turns off automatic checkpoints, so keep the
+        # write-ahead log from growing with the crawl.
+        checkpoint(self.database, 'PASSIVE')
+        self.unflushed.clear()
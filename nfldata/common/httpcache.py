@@ -0,0 +1,501 @@
+"""Defines an HTTP cache storage that keeps every cached response in a single
+SQLite database, and a cache policy and middlewares that revalidate stale
+responses."""
+import json
+import logging
+import os
+import time
+import zlib
+from urllib.parse import urljoin
+from scrapy.downloadermiddlewares.httpcache import HttpCacheMiddleware
+from scrapy.extensions.httpcache import rfc1123_to_epoch
+from scrapy.http import Headers, Request
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.httpobj import urlparse_cached
+from scrapy.utils.project import data_path
+from scrapy_splash.dupefilter import splash_request_fingerprint
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+from nfldata.common.sqlite import checkpoint, connect
+
+# The name of the database under HTTPCACHE_DIR that responses are cached in.
+HTTPCACHE_DATABASE = 'httpcache.sqlite'
+
+# Commit the cached responses after this many have been stored.
+_COMMIT_RESPONSES = 100
+
+# Check whether the cache has outgrown its maximum size after this many
+# responses have been stored.
+_EVICT_RESPONSES = 1000
+
+# The request meta keys that are set by Scrapy and Splash rather than by the
+# spiders, which are not recorded with the requests.
+_FRAMEWORK_META_KEYS = {
+    'ajax_crawlable', 'depth', 'download_latency', 'download_slot',
+    'download_timeout', 'retry_times', 'splash'
+}
+
+# The headers of a page that are used to revalidate it, and the keys that the
+# render profiles return them in.
+_RENDERED_VALIDATORS = ((b'ETag', 'etag'), (b'Last-Modified', 'last_modified'))
+
+
+def open_cache(path, **kwargs):
+    """Opens the cache database at the given path, and creates its tables if
+    they do not exist. Any keyword arguments are passed on to connect."""
+
+    database = connect('bulk_load', path=path, **kwargs)
+    database.execute('''
+        CREATE TABLE IF NOT EXISTS responses (
+            fingerprint TEXT PRIMARY KEY,
+            url TEXT,
+            status INTEGER,
+            headers BLOB,
+            body BLOB,
+            size INTEGER,
+            stored_at REAL,
+            accessed_at REAL
+        )
+    ''')
+    database.execute('''
+        CREATE TABLE IF NOT EXISTS requests (
+            spider TEXT,
+            fingerprint TEXT,
+            url TEXT,
+            callback TEXT,
+            meta TEXT,
+            PRIMARY KEY (spider, fingerprint)
+        )
+    ''')
+    database.execute('''
+        CREATE INDEX IF NOT EXISTS responses_by_accessed_at
+        ON responses (accessed_at)
+    ''')
+    database.execute('''
+        CREATE INDEX IF NOT EXISTS responses_by_stored_at
+        ON responses (stored_at)
+    ''')
+    database.commit()
+    return database
+
+
+def expire_responses(database, expiration_secs):
+    """Deletes the responses that were stored more than expiration_secs
+    seconds ago, and returns how many were deleted. Responses never expire if
+    expiration_secs is 0."""
+
+    if expiration_secs <= 0:
+        return 0
+    return database.execute('DELETE FROM responses WHERE stored_at < ?',
+                            (time.time() - expiration_secs,)).rowcount
+
+
+def evict_responses(database, max_size):
+    """Deletes the least recently used responses until the compressed
+    responses take up at most max_size bytes, and returns how many were
+    deleted. The cache is unbounded if max_size is 0."""
+
+    if max_size <= 0:
+        return 0
+    [size] = database.execute(
+        'SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()
+    if size <= max_size:
+        return 0
+
+    evicted = []
+    for fingerprint, response_size in database.execute(
+            'SELECT fingerprint, size FROM responses ORDER BY accessed_at'):
+        if size <= max_size:
+            break
+        evicted.append((fingerprint,))
+        size -= response_size
+    database.executemany('DELETE FROM responses WHERE fingerprint = ?', evicted)
+    return len(evicted)
+
+
+def compact_cache(database):
+    """Rebuilds the cache database to reclaim the space left by deleted
+    responses."""
+
+    database.execute('''
+        DELETE FROM requests
+        WHERE fingerprint NOT IN (SELECT fingerprint FROM responses)
+    ''')
+    database.commit()
+    checkpoint(database, 'TRUNCATE')
+    database.execute('VACUUM')
+    checkpoint(database, 'TRUNCATE')
+
+
+def callback_name(request, spider):
+    """Returns the name of the callback of the given request, which is either
+    the name of a method of the spider, or the import path of a function."""
+
+    callback = request.callback
+    if callback is None:
+        return 'parse'
+    if getattr(callback, '__self__', None) is spider:
+        return callback.__name__
+    return f'{callback.__module__}.{callback.__qualname__}'
+
+
+def spider_meta(request):
+    """Returns the meta of the given request that was set by the spider, as
+    JSON."""
+
+    meta = {}
+    for key, value in request.meta.items():
+        if key in _FRAMEWORK_META_KEYS or key.startswith('_'):
+            continue
+        try:
+            json.dumps(value)
+        except TypeError:
+            continue
+        meta[key] = value
+    return json.dumps(meta)
+
+
+def cache_fingerprint(request, splash_url):
+    """Returns the fingerprint that the response to the given request is cached
+    under. Requests that SplashPoolMiddleware sent to an instance of the pool
+    have the same fingerprint as if they had been sent to splash_url, so that
+    the cache does not depend on which instance rendered a page."""
+
+    splash_options = request.meta.get('splash')
+    if not splash_options or 'splash_url' not in splash_options:
+        return splash_request_fingerprint(request)
+
+    meta = dict(request.meta)
+    meta['splash'] = {
+        key: value
+        for key, value in splash_options.items()
+        if key != 'splash_url'
+    }
+    url = request.url
+    if request.meta.get('_splash_processed'):
+        url = urljoin(splash_url, splash_options['endpoint'])
+    return splash_request_fingerprint(request.replace(url=url, meta=meta))
+
+
+def cached_responses(database, spider_name):
+    """Yields the callback name, URL, meta, status, raw headers and compressed
+    body of every cached response to a request made by the named spider."""
+
+    yield from database.execute(
+        '''
+        SELECT requests.callback, requests.url, requests.meta,
+               responses.status, responses.headers, responses.body
+        FROM requests JOIN responses USING (fingerprint)
+        WHERE requests.spider = ?
+    ''', (spider_name,))
+
+
+class ConditionalCachePolicy:
+    """Serves cached responses for HTTPCACHE_EXPIRATION_SECS after they were
+    fetched, and revalidates them after that instead of throwing them away.
+
+    A stale response is requested again with If-None-Match and
+    If-Modified-Since built from its ETag and Last-Modified headers. If the
+    site answers 304 Not Modified, or fails with a server error, the cached
+    response is used. HttpCacheMiddleware counts these as httpcache/revalidate,
+    and the pages fetched in full again as httpcache/invalidate.
+
+    A response is fresh for HTTPCACHE_EXPIRATION_SECS after it was stored or
+    last revalidated, which ConditionalCacheMiddleware records. Responses
+    without an ETag or Last-Modified header cannot be revalidated, so they are
+    fetched in full again.
+
+    Pages rendered by Splash carry Splash's headers rather than the site's, so
+    a stale render is revalidated by SplashRevalidationMiddleware instead, with
+    a direct conditional request to the page itself. Render profiles return
+    the validators of the page, which are saved with the render."""
+
+    def __init__(self, settings):
+        self.ignore_schemes = settings.getlist('HTTPCACHE_IGNORE_SCHEMES')
+        self.ignore_http_codes = [
+            int(code)
+            for code in settings.getlist('HTTPCACHE_IGNORE_HTTP_CODES')
+        ]
+        self.expiration_secs = settings.getint('HTTPCACHE_EXPIRATION_SECS')
+
+    def should_cache_request(self, request):
+        """Returns whether responses to the given request may be cached."""
+
+        return urlparse_cached(request).scheme not in self.ignore_schemes
+
+    def should_cache_response(self, response, request):  # pylint: disable=unused-argument
+        """Returns whether the given response may be cached."""
+
+        return (response.status not in self.ignore_http_codes and
+                response.status != 304)
+
+    def is_cached_response_fresh(self, cachedresponse, request):
+        """Returns whether the cached response can be used without asking the
+        site. If not, the conditional headers are added to the request."""
+
+        if self.expiration_secs <= 0:
+            return True
+        # SqliteCacheStorage records when the response was stored or last
+        # revalidated, which other storages do not.
+        fetched_at = request.meta.get('_cache_stored_at') or rfc1123_to_epoch(
+            cachedresponse.headers.get(b'Date'))
+        if fetched_at and time.time() - fetched_at < self.expiration_secs:
+            return True
+
+        validators = {}
+        etag = cachedresponse.headers.get(b'ETag')
+        if etag:
+            validators[b'If-None-Match'] = etag
+        last_modified = cachedresponse.headers.get(b'Last-Modified')
+        if last_modified:
+            validators[b'If-Modified-Since'] = last_modified
+        if not validators:
+            return False
+        if 'splash' in request.meta:
+            request.meta['_splash_revalidate'] = validators
+        else:
+            request.headers.update(validators)
+        return False
+
+    def is_cached_response_valid(self, cachedresponse, response, request):  # pylint: disable=unused-argument
+        """Returns whether the cached response should be used instead of the
+        response to its revalidation."""
+
+        return response.status == 304 or response.status >= 500
+
+
+class ConditionalCacheMiddleware(HttpCacheMiddleware):
+    """Caches responses like HttpCacheMiddleware, and marks a stale response
+    that the site answered 304 Not Modified for as fresh again, so that it is
+    not revalidated again until HTTPCACHE_EXPIRATION_SECS have passed.
+
+    The storage must have a refresh_response method, like
+    SqliteCacheStorage."""
+
+    def process_response(self, request, response, spider):
+        """Returns the cached response if it is still valid, and refreshes it in
+        the storage if the site did not modify it."""
+
+        cachedresponse = request.meta.get('cached_response')
+        result = super().process_response(request, response, spider)
+        if (cachedresponse is not None and result is cachedresponse and
+                response.status == 304):
+            self.storage.refresh_response(spider, request, response)
+        return result
+
+
+class SplashRevalidationMiddleware:
+    """Revalidates stale pages rendered by Splash without rendering them again.
+
+    Render profiles return the ETag and Last-Modified headers of the page with
+    its render, which are saved with the render in the cache. Once it is
+    stale, ConditionalCachePolicy marks it with them, and before it is rendered
+    again, the page itself is requested directly with them. If the site
+    answers 304 Not Modified, that answer is passed on to
+    ConditionalCacheMiddleware, which serves the cached render. Otherwise the
+    page is rendered again.
+
+    This must come after ConditionalCacheMiddleware in
+    DOWNLOADER_MIDDLEWARES."""
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.stats = crawler.stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Creates the middleware for the crawler."""
+
+        return cls(crawler)
+
+    def process_request(self, request, spider):
+        """Requests the page of a stale render directly, and returns the answer
+        if it is 304 Not Modified."""
+
+        validators = request.meta.pop('_splash_revalidate', None)
+        if not validators:
+            return None
+
+        url = request.meta['splash']['args'].get('url')
+        if url is None:
+            return None
+        direct_request = Request(
+            url,
+            headers=validators,
+            meta={
+                'dont_cache': True,
+                'download_timeout': request.meta.get('download_timeout', 180)
+            },
+            priority=request.priority,
+            dont_filter=True)
+        if self.stats:
+            self.stats.inc_value('httpcache/splash_revalidate/requests')
+        deferred = self.crawler.engine.download(direct_request, spider)
+        deferred.addCallbacks(self._revalidated, lambda _: None)
+        return deferred
+
+    def process_response(self, request, response, spider):  # pylint: disable=unused-argument
+        """Saves the validators of the page that a render profile returned in
+        the headers of its render."""
+
+        if ('cached' in response.flags or response.status != 200 or
+                request.meta.get('splash', {}).get('endpoint') != 'execute'):
+            return response
+        try:
+            rendered = json.loads(response.body)
+        except ValueError:
+            return response
+        if not isinstance(rendered, dict):
+            return response
+        for header, key in _RENDERED_VALIDATORS:
+            if rendered.get(key):
+                response.headers[header] = rendered[key]
+        return response
+
+    def _revalidated(self, response):
+        if response.status != 304:
+            return None
+        if self.stats:
+            self.stats.inc_value('httpcache/splash_revalidate/not_modified')
+        return response
+
+
+class SqliteCacheStorage:
+    """Stores the responses cached by HttpCacheMiddleware in a single SQLite
+    database under HTTPCACHE_DIR, keyed by their Splash-aware request
+    fingerprint. Bodies are compressed with zlib.
+
+    The cache is shared by all spiders, so a page cached by one spider is not
+    fetched again by another. Responses are deleted after
+    HTTPCACHE_SQLITE_EXPIRATION_SECS, or HTTPCACHE_EXPIRATION_SECS if it is not
+    set, so that the cache policy can revalidate them until then. Once the
+    cache holds more than HTTPCACHE_SQLITE_MAX_SIZE bytes, the least recently
+    used responses are evicted. Use nfldata.analysis.httpcache to compact
+    it."""
+
+    def __init__(self, settings):
+        self.cachedir = data_path(settings['HTTPCACHE_DIR'], createdir=True)
+        self.path = os.path.join(self.cachedir, HTTPCACHE_DATABASE)
+        self.expiration_secs = settings.getint(
+            'HTTPCACHE_SQLITE_EXPIRATION_SECS',
+            settings.getint('HTTPCACHE_EXPIRATION_SECS'))
+        self.max_size = settings.getint('HTTPCACHE_SQLITE_MAX_SIZE', 0)
+        self.splash_url = settings.get('SPLASH_URL', 'http://127.0.0.1:8050')
+        self.database = None
+        self._uncommitted = 0
+        self._stored = 0
+
+    def open_spider(self, spider):  # pylint: disable=unused-argument
+        """Opens the cache database, and deletes the expired responses."""
+
+        self.database = open_cache(self.path)
+        logging.debug('Using SQLite cache storage in %s', self.path)
+        expire_responses(self.database, self.expiration_secs)
+        self.database.commit()
+
+    def close_spider(self, spider):  # pylint: disable=unused-argument
+        """Evicts responses if the cache is too large, and closes the cache
+        database."""
+
+        evict_responses(self.database, self.max_size)
+        self.database.commit()
+        checkpoint(self.database, 'TRUNCATE')
+        self.database.close()
+
+    def retrieve_response(self, spider, request):
+        """Returns the cached response to the given request, or None if it is
+        not cached or has expired.
+
+        The request's spider, callback and meta are also recorded, so that
+        nfldata.analysis.reparse can run the callbacks over the cached
+        responses later."""
+
+        fingerprint = cache_fingerprint(request, self.splash_url)
+        # Splash requests are sent to the Splash endpoint by now, so record the
+        # URL of the page itself.
+        splash_args = request.meta.get('splash', {}).get('args', {})
+        url = splash_args.get('url', request.url)
+        self.database.execute(
+            '''
+            INSERT OR REPLACE INTO requests (
+                spider, fingerprint, url, callback, meta
+            ) VALUES (?, ?, ?, ?, ?)
+        ''', (spider.name, fingerprint, url, callback_name(
+                request, spider), spider_meta(request)))
+
+        row = self.database.execute(
+            '''
+            SELECT url, status, headers, body, stored_at FROM responses
+            WHERE fingerprint = ?
+        ''', (fingerprint,)).fetchone()
+        if row is None:
+            return None
+        url, status, raw_headers, body, stored_at = row
+        if 0 < self.expiration_secs < time.time() - stored_at:
+            return None
+        request.meta['_cache_stored_at'] = stored_at
+
+        self.database.execute(
+            'UPDATE responses SET accessed_at = ? WHERE fingerprint = ?',
+            (time.time(), fingerprint))
+        self._commit_if_due()
+
+        headers = Headers(headers_raw_to_dict(raw_headers))
+        respcls = responsetypes.from_args(headers=headers, url=url)
+        return respcls(url=url,
+                       headers=headers,
+                       status=status,
+                       body=zlib.decompress(body))
+
+    def store_response(self, spider, request, response):  # pylint: disable=unused-argument
+        """Stores the given response to the request in the cache."""
+
+        headers = headers_dict_to_raw(response.headers)
+        body = zlib.compress(response.body)
+        now = time.time()
+        self.database.execute(
+            '''
+            INSERT OR REPLACE INTO responses (
+                fingerprint, url, status, headers, body, size, stored_at,
+                accessed_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (cache_fingerprint(request,
+                                self.splash_url), response.url, response.status,
+              headers, body, len(headers) + len(body), now, now))
+        self._commit_if_due()
+
+        self._stored += 1
+        if self._stored % _EVICT_RESPONSES == 0:
+            evict_responses(self.database, self.max_size)
+
+    def refresh_response(self, spider, request, response):  # pylint: disable=unused-argument
+        """Marks the cached response to the request as stored now, and updates
+        its Date, ETag and Last-Modified headers from the 304 Not Modified
+        response that revalidated it."""
+
+        fingerprint = cache_fingerprint(request, self.splash_url)
+        row = self.database.execute(
+            'SELECT headers FROM responses WHERE fingerprint = ?',
+            (fingerprint,)).fetchone()
+        if row is None:
+            return
+        [raw_headers] = row
+        headers = Headers(headers_raw_to_dict(raw_headers))
+        for header in (b'Date', b'ETag', b'Last-Modified'):
+            if header in response.headers:
+                headers[header] = response.headers[header]
+        new_headers = headers_dict_to_raw(headers)
+        self.database.execute(
+            '''
+            UPDATE responses
+            SET headers = ?, size = size + ?, stored_at = ?
+            WHERE fingerprint = ?
+        ''', (new_headers, len(new_headers) - len(raw_headers), time.time(),
+              fingerprint))
+        self._commit_if_due()
+
+    def _commit_if_due(self):
+        self._uncommitted += 1
+        if self._uncommitted >= _COMMIT_RESPONSES:
+            self.database.commit()
+            checkpoint(self.database)
+            self._uncommitted = 0
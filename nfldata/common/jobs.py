@@ -0,0 +1,147 @@
+"""Defines what is needed to pause a crawl and resume it later from its JOBDIR."""
+import json
+import logging
+import os
+import time
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.squeues import PickleLifoDiskQueue
+from scrapy.utils.misc import load_object
+from twisted.internet import task
+
+# The file under JOBDIR that the progress of a crawl is saved in.
+PROGRESS_FILE = 'progress.json'
+
+
+def read_progress(jobdir):
+    """Returns the progress saved in the given job directory, or None if there
+    is none."""
+
+    try:
+        with open(os.path.join(jobdir, PROGRESS_FILE)) as progress_file:
+            return json.load(progress_file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def is_resumed_crawl(settings):
+    """Returns whether the crawl continues an earlier run of the job in JOBDIR
+    that did not finish."""
+
+    jobdir = settings.get('JOBDIR')
+    if not jobdir:
+        return False
+    progress = read_progress(jobdir)
+    return progress is not None and not progress.get('finished')
+
+
+class CallbackPathDiskQueue(PickleLifoDiskQueue):
+    """Saves the requests waiting in the scheduler to JOBDIR, like
+    PickleLifoDiskQueue.
+
+    Scrapy can only save requests whose callbacks are methods of the spider,
+    and keeps the others in memory, where they are lost when the crawl stops.
+    Most of the callbacks here are functions, so this saves them by their
+    import path instead."""
+
+    def push(self, request):
+        paths = {}
+        for name in ('callback', 'errback'):
+            function = getattr(request, name)
+            if function is None or getattr(function, '__self__',
+                                           None) is self.spider:
+                continue
+            paths[name] = f'{function.__module__}.{function.__qualname__}'
+        if paths:
+            request = request.replace(meta=dict(request.meta,
+                                                _callback_paths=paths),
+                                      **dict.fromkeys(paths))
+        return super().push(request)
+
+    def pop(self):
+        request = super().pop()
+        if request is None:
+            return None
+        paths = request.meta.pop('_callback_paths', None)
+        if paths:
+            request = request.replace(
+                **{name: load_object(path) for name, path in paths.items()})
+        return request
+
+
+class CrawlProgress:
+    """Logs how many requests a crawl has completed and how many are pending
+    every CRAWL_PROGRESS_INTERVAL seconds.
+
+    If JOBDIR is set, the progress is also saved in it, and the completed
+    requests of earlier runs of the same job are included, so that
+    scripts/spider.py can show the progress of a resumed crawl."""
+
+    def __init__(self, crawler, interval=60, jobdir=None):
+        self.crawler = crawler
+        self.interval = interval
+        self.jobdir = jobdir
+        self.completed_before = 0
+        self._task = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Creates the extension from the settings of the crawler."""
+
+        interval = crawler.settings.getfloat('CRAWL_PROGRESS_INTERVAL', 60)
+        if not interval:
+            raise NotConfigured
+        extension = cls(crawler, interval, crawler.settings.get('JOBDIR'))
+        crawler.signals.connect(extension.spider_opened,
+                                signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed,
+                                signal=signals.spider_closed)
+        return extension
+
+    def spider_opened(self, spider):  # pylint: disable=unused-argument
+        """Reads the progress of earlier runs, and starts logging."""
+
+        if self.jobdir:
+            progress = read_progress(self.jobdir)
+            if progress and progress.get('finished'):
+                logging.warning(
+                    'The job in %s already finished, so the requests it made '
+                    'will be filtered as duplicates. Delete it to crawl again.',
+                    self.jobdir)
+            if progress:
+                self.completed_before = progress['completed']
+        self._task = task.LoopingCall(self.log)
+        self._task.start(self.interval, now=False)
+
+    def spider_closed(self, spider, reason):  # pylint: disable=unused-argument
+        """Stops logging, and saves the final progress."""
+
+        if self._task and self._task.running:
+            self._task.stop()
+        self.log(finished=reason == 'finished')
+
+    def log(self, finished=False):
+        """Logs the progress, and saves it to JOBDIR."""
+
+        stats = self.crawler.stats
+        completed = self.completed_before + stats.get_value(
+            'response_received_count', 0)
+        slot = self.crawler.engine.slot
+        pending = len(slot.scheduler) if slot else 0
+        logging.info('Progress: %d requests completed, %d pending', completed,
+                     pending)
+        if not self.jobdir:
+            return
+
+        os.makedirs(self.jobdir, exist_ok=True)
+        path = os.path.join(self.jobdir, PROGRESS_FILE)
+        with open(path + '.new', 'w') as progress_file:
+            json.dump(
+                {
+                    'completed': completed,
+                    'pending': pending,
+                    'items': stats.get_value('item_scraped_count', 0),
+                    'finished': finished,
+                    'updated_at': time.time(),
+                }, progress_file)
+        os.replace(path + '.new', path)
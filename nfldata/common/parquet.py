@@ -0,0 +1,88 @@
+"""Defines common utilities needed to export the SQLite tables to Parquet."""
+import os
+import re
+import shutil
+import pyarrow
+import pyarrow.compute
+import pyarrow.parquet
+
+# The directory that each table is exported to, as a subdirectory named after
+# the table.
+EXPORT_DIRECTORY = 'parquet'
+
+# The number of rows to fetch from SQLite at a time while exporting a table.
+_FETCH_SIZE = 10000
+
+_TEAM_SEASON = re.compile(r'/teams/[^/]+/(\d{4})\.htm$')
+
+
+def team_season(team):
+    """Returns the season of the given relative link to a team on Pro Football
+    Reference, or None if the link does not contain one."""
+
+    match = _TEAM_SEASON.search(team or '')
+    return int(match.group(1)) if match else None
+
+
+def export_table(database, item_class, directory=EXPORT_DIRECTORY):
+    """Writes the table of the given item class to Parquet under
+    directory/<table>, replacing any earlier export of it, and returns the
+    number of rows written.
+
+    Text columns are dictionary encoded. Tables with a team column are
+    partitioned by the season of the team, in Hive-style season=<year>
+    subdirectories, so that readers can skip the seasons they do not need."""
+
+    columns = item_class.sql_columns
+    values = [[] for _ in columns]
+    cursor = database.execute('SELECT {} FROM {}'.format(
+        ', '.join(columns), item_class.sql_table))
+    while True:
+        rows = cursor.fetchmany(_FETCH_SIZE)
+        if not rows:
+            break
+        for column_values, row_values in zip(values, zip(*rows)):
+            column_values.extend(row_values)
+
+    arrays = []
+    for column_values in values:
+        array = pyarrow.array(column_values)
+        if pyarrow.types.is_string(array.type):
+            array = array.dictionary_encode()
+        arrays.append(array)
+    table = pyarrow.Table.from_arrays(arrays, names=list(columns))
+
+    # Write the new export next to the old one, and only replace the old one
+    # once it is complete.
+    table_directory = os.path.join(directory, item_class.sql_table)
+    new_directory = table_directory + '.new'
+    shutil.rmtree(new_directory, ignore_errors=True)
+    os.makedirs(new_directory)
+    if 'team' in columns:
+        seasons = pyarrow.array(
+            [team_season(team) for team in values[columns.index('team')]],
+            type=pyarrow.int16())
+        for season in seasons.unique().to_pylist():
+            if season is None:
+                mask = pyarrow.compute.is_null(seasons)
+                partition = '__HIVE_DEFAULT_PARTITION__'
+            else:
+                mask = pyarrow.compute.equal(seasons, season)
+                partition = str(season)
+            partition_directory = os.path.join(new_directory,
+                                               f'season={partition}')
+            os.makedirs(partition_directory)
+            pyarrow.parquet.write_table(
+                table.filter(mask),
+                os.path.join(partition_directory, 'part-0.parquet'))
+    else:
+        pyarrow.parquet.write_table(
+            table, os.path.join(new_directory, 'part-0.parquet'))
+
+    old_directory = table_directory + '.old'
+    shutil.rmtree(old_directory, ignore_errors=True)
+    if os.path.exists(table_directory):
+        os.rename(table_directory, old_directory)
+    os.rename(new_directory, table_directory)
+    shutil.rmtree(old_directory, ignore_errors=True)
+    return table.num_rows
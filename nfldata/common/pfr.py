@@ -1,16 +1,210 @@
 """Defines common utilities needed to scrape Pro Football Reference."""
-from urllib.parse import urljoin
-from scrapy_splash import SplashRequest
+import collections
+import re
+from urllib.parse import urljoin, urlparse
+from lxml import etree
+from scrapy.http import HtmlResponse
+from nfldata.common.splash import RenderProfile, splash_request
 
 PRO_FOOTBALL_REFERENCE_DOMAIN = 'pro-football-reference.com'
 SPLASH_REQUEST_ARGS = {'wait': 1, 'timeout': 300}
 
+# The render profiles of the pages of Pro Football Reference. Callbacks choose
+# one with nfldata.common.splash.render_profile.
+PFR_RENDER_PROFILES = {
+    'franchise': RenderProfile('table#team_index'),
+    'team_season': RenderProfile('#meta'),
+    'roster': RenderProfile('table#games_played_team'),
+    'injuries': RenderProfile('table#team_injuries'),
+    'players': RenderProfile('#div_players'),
+    # The leaderboards and most of the stats tables of a player are filled in
+    # by scripts, and players without them have no selector to wait for.
+    'player': RenderProfile('#meta', min_wait=SPLASH_REQUEST_ARGS['wait']),
+    'executive': RenderProfile('table#exec_results'),
+    'stadium': RenderProfile('#meta'),
+}
+
+# The domains that pages of Pro Football Reference may load scripts from. The
+# scripts that show the hidden tables are served from ssref.net.
+PFR_RENDER_DOMAINS = (PRO_FOOTBALL_REFERENCE_DOMAIN, 'sports-reference.com',
+                      'ssref.net')
+
+_HTML_COMMENT = re.compile(r'<!--(.*?)-->', re.DOTALL)
+
+# Selects the body rows of the stats table with the given id, the same as
+# table#<id> tbody tr:not(.thead).
+_STATS_TABLE_ROWS = etree.XPath(
+    '//table[@id=$table_id]//tbody//tr'
+    '[not(contains(concat(" ", normalize-space(@class), " "), " thead "))]')
+
+# A single cell of a stats table. text is the first text directly inside the
+# cell, and link and link_text are the href and text of the first link in it,
+# the same as the ::text, a::attr(href) and a::text selectors.
+StatsCell = collections.namedtuple('StatsCell',
+                                   ['text', 'link', 'link_text', 'attributes'])
+
+# The links in the meta paragraphs of a team season page. assistant_coaches and
+# assistant_positions are the links and positions of the other notable
+# assistant coaches, in the order they are listed.
+TeamMeta = collections.namedtuple('TeamMeta', [
+    'head_coach', 'offensive_coordinator', 'defensive_coordinator',
+    'assistant_coaches', 'assistant_positions', 'stadium'
+])
+
+# The labels of the meta paragraphs that link to a single page, and the
+# TeamMeta fields they are stored in.
+_TEAM_META_LABELS = {
+    'Coach:': 'head_coach',
+    'Offensive Coordinator:': 'offensive_coordinator',
+    'Defensive Coordinator:': 'defensive_coordinator',
+    'Stadium:': 'stadium',
+}
+_TEAM_META_ASSISTANTS_LABEL = 'Other Notable Asst'
+_ASSISTANT_POSITION = re.compile(r'\((.+)\)')
+
 
 def pfr_request(uri, meta=None, callback=None):
-    """Creates a SplashRequest specifically for Pro Football Reference."""
+    """Creates a SplashRequest specifically for Pro Football Reference, which
+    is rendered with the render profile of the callback if it has one."""
 
     url = urljoin('http://' + PRO_FOOTBALL_REFERENCE_DOMAIN, uri)
-    return SplashRequest(url,
-                         callback=callback,
-                         args=SPLASH_REQUEST_ARGS,
-                         meta=meta)
+    return splash_request(url,
+                          callback=callback,
+                          meta=meta,
+                          args=SPLASH_REQUEST_ARGS,
+                          profiles=PFR_RENDER_PROFILES,
+                          allowed_domains=PFR_RENDER_DOMAINS)
+
+
+def team_season_links(response, first_season=None):
+    """Returns the season and link of each team on a franchise page, skipping
+    the seasons before first_season if it is given."""
+
+    seasons = response.css('th[data-stat=year_id] a::text').getall()
+    links = response.css('th[data-stat=year_id] a::attr(href)').getall()
+    return [(int(season), link)
+            for season, link in zip(seasons, links)
+            if first_season is None or int(season) >= first_season]
+
+
+def stats_table_rows(response, table_id):
+    """Returns each body row of the stats table with the given id as a dict from
+    the data-stat of each of its cells to a StatsCell.
+
+    The table is walked once with lxml, instead of running a CSS selector per
+    field of each row."""
+
+    rows = []
+    for row in _STATS_TABLE_ROWS(response.selector.root, table_id=table_id):
+        cells = {}
+        for cell in row:
+            stat = cell.get('data-stat')
+            if stat is None:
+                continue
+            link = next(cell.iter('a'), None)
+            cells[stat] = StatsCell(
+                text=_first_text(cell),
+                link=link.get('href') if link is not None else None,
+                link_text=_first_text(link) if link is not None else None,
+                attributes=dict(cell.attrib))
+        rows.append(cells)
+    return rows
+
+
+def _first_text(element):
+    if element.text is not None:
+        return element.text
+    return next((child.tail for child in element if child.tail is not None),
+                None)
+
+
+def parse_team_meta(response):
+    """Parses the meta paragraphs of a team season page into a TeamMeta.
+
+    Each paragraph is read once. A field is the first link in the first
+    paragraph with its label that has a link, or None if there is none."""
+
+    fields = dict.fromkeys(TeamMeta._fields)
+    fields['assistant_coaches'] = []
+    fields['assistant_positions'] = []
+    for paragraph in response.selector.root.iter('p'):
+        text = paragraph.text_content()
+        links = [
+            child.get('href')
+            for child in paragraph
+            if child.tag == 'a' and child.get('href') is not None
+        ]
+        for label, field in _TEAM_META_LABELS.items():
+            if label in text and links and fields[field] is None:
+                fields[field] = links[0]
+        if _TEAM_META_ASSISTANTS_LABEL in text:
+            fields['assistant_coaches'].extend(links)
+            # The positions follow each link in parentheses.
+            texts = [paragraph.text] + [child.tail for child in paragraph]
+            for child_text in filter(None, texts):
+                fields['assistant_positions'].extend(
+                    _ASSISTANT_POSITION.findall(child_text))
+    return TeamMeta(**fields)
+
+
+def uncomment_hidden_tables(html):
+    """Removes the HTML comments around the tables that Pro Football Reference
+    only shows once its scripts have run, and returns the new HTML and the
+    number of tables that were uncommented."""
+
+    uncommented = 0
+
+    def uncomment(match):
+        nonlocal uncommented
+        if '<table' not in match.group(1):
+            return match.group(0)
+        uncommented += 1
+        return match.group(1)
+
+    return _HTML_COMMENT.sub(uncomment, html), uncommented
+
+
+class PfrDirectMiddleware:
+    """Fetches Pro Football Reference pages directly instead of rendering them
+    with Splash, for spiders that set pfr_direct to True. The tables hidden in
+    HTML comments are uncommented before the callbacks see the response, so
+    the same selectors work on both.
+
+    This must come before SplashCookiesMiddleware and SplashMiddleware in
+    DOWNLOADER_MIDDLEWARES."""
+
+    def __init__(self, stats=None):
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Creates the middleware with the stats of the crawler."""
+
+        return cls(stats=crawler.stats)
+
+    def process_request(self, request, spider):
+        """Strips the Splash options from requests to Pro Football Reference
+        if the spider opted in."""
+
+        if not getattr(spider, 'pfr_direct', False):
+            return None
+        if not urlparse(
+                request.url).hostname.endswith(PRO_FOOTBALL_REFERENCE_DOMAIN):
+            return None
+        if request.meta.pop('splash', None) is not None:
+            request.meta['pfr_direct'] = True
+            if self.stats:
+                self.stats.inc_value('pfr/direct/requests')
+        return None
+
+    def process_response(self, request, response, spider):  # pylint: disable=unused-argument
+        """Uncomments the hidden tables of directly fetched pages."""
+
+        if not request.meta.get('pfr_direct') or not isinstance(
+                response, HtmlResponse):
+            return response
+
+        html, uncommented = uncomment_hidden_tables(response.text)
+        if self.stats:
+            self.stats.inc_value('pfr/direct/uncommented_tables', uncommented)
+        return response.replace(body=html)
@@ -0,0 +1,44 @@
+"""Defines common utilities needed to limit crawls to recent seasons."""
+from nfldata.common.sqlite import connect, table_exists
+
+
+def latest_stored_season(database):
+    """Returns the latest season in the teams table of the given database, or
+    None if no teams have been stored yet."""
+
+    if not table_exists(database, 'teams'):
+        return None
+    [season] = database.execute('SELECT MAX(year) FROM teams').fetchone()
+    return season
+
+
+def first_season_to_crawl(settings):
+    """Returns the first season that the spiders should crawl, or None if they
+    should crawl every season.
+
+    CRAWL_FIRST_SEASON takes precedence if it is set. Otherwise, if
+    INCREMENTAL_CRAWL_ENABLED is set, this is the latest season already stored,
+    less INCREMENTAL_CRAWL_LOOKBACK_SEASONS."""
+
+    if settings.get('CRAWL_FIRST_SEASON'):
+        return settings.getint('CRAWL_FIRST_SEASON')
+    if not settings.getbool('INCREMENTAL_CRAWL_ENABLED', False):
+        return None
+
+    database = connect('read_heavy')
+    try:
+        season = latest_stored_season(database)
+    finally:
+        database.close()
+    if season is None:
+        return None
+    return season - settings.getint('INCREMENTAL_CRAWL_LOOKBACK_SEASONS', 0)
+
+
+def is_incremental_crawl(settings):
+    """Returns whether the spiders only crawl some of the seasons, in which
+    case the rows of the other seasons must be kept."""
+
+    return bool(
+        settings.get('CRAWL_FIRST_SEASON') or
+        settings.getbool('INCREMENTAL_CRAWL_ENABLED', False))
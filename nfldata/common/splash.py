@@ -0,0 +1,358 @@
+"""Defines how pages are rendered with Splash, and a downloader middleware that
+spreads Splash requests across a pool of Splash instances."""
+import collections
+import logging
+import time
+from urllib.parse import urljoin, urlparse
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy_splash import SplashRequest
+from twisted.internet import reactor, task
+from twisted.web.client import Agent, readBody
+
+# The longest that a render profile waits for its selector to match, in seconds.
+RENDER_PROFILE_MAX_WAIT = 10
+
+# Renders a page without images, stylesheets, fonts or requests to other
+# domains, and returns it as soon as args.wait_for matches something after
+# args.min_wait seconds, or after args.max_wait seconds. The ETag and
+# Last-Modified headers of the page are returned with it, so that it can be
+# revalidated without rendering it again.
+_RENDER_PROFILE_SCRIPT = """
+function is_allowed(url, domains)
+  local host = url:match('^%a+://([^/:]+)')
+  if host == nil then
+    return true
+  end
+  for _, domain in ipairs(domains) do
+    if host == domain or host:sub(-#domain - 1) == '.' .. domain then
+      return true
+    end
+  end
+  return false
+end
+
+function main(splash, args)
+  splash.images_enabled = false
+  splash:on_request(function(request)
+    local path = request.url:match('^[^?#]*')
+    if not is_allowed(request.url, args.allowed_domains) or
+        path:match('%.css$') or path:match('%.woff2?$') or
+        path:match('%.ttf$') or path:match('%.svg$') then
+      request:abort()
+    end
+  end)
+  assert(splash:go(args.url))
+  local waited = args.min_wait
+  if waited > 0 then
+    splash:wait(waited)
+  end
+  while not splash:select(args.wait_for) and waited < args.max_wait do
+    splash:wait(0.1)
+    waited = waited + 0.1
+  end
+  local history = splash:history()
+  local response = history[#history].response
+  local etag, last_modified
+  for _, header in ipairs(response.headers) do
+    local name = header.name:lower()
+    if name == 'etag' then
+      etag = header.value
+    elseif name == 'last-modified' then
+      last_modified = header.value
+    end
+  end
+  return {
+    html = splash:html(),
+    url = splash:url(),
+    http_status = response.status,
+    etag = etag,
+    last_modified = last_modified,
+  }
+end
+"""
+
+# The upper bounds, in seconds, of the buckets of the render latency
+# histograms.
+_LATENCY_BUCKETS = (1, 5, 15, 60, 300)
+
+# Splash answers 503 when it has too many renders queued, which counts as a
+# failure of the instance rather than of the page.
+_FAILURE_STATUSES = {503}
+
+# How a page is rendered: the CSS selector that the page is returned as soon as
+# it matches, and how many seconds to wait before checking it, which gives the
+# scripts of the page time to run when the selector is already in its HTML.
+RenderProfile = collections.namedtuple('RenderProfile',
+                                       ['wait_for', 'min_wait'],
+                                       defaults=[0])
+
+
+def render_profile(name):
+    """Marks a callback to have its pages rendered with the named profile, which
+    splash_request looks up in the profiles it is given."""
+
+    def decorate(callback):
+        callback.render_profile = name
+        return callback
+
+    return decorate
+
+
+def splash_request(url,
+                   callback=None,
+                   meta=None,
+                   args=None,
+                   profiles=None,
+                   allowed_domains=()):
+    """Creates a SplashRequest for the given URL.
+
+    If the callback was marked with render_profile, and the profile is one of
+    profiles, which maps profile names to RenderProfiles, the page is rendered
+    without images, stylesheets, fonts or requests outside of allowed_domains.
+    It is returned once the profile's selector matches, instead of after a
+    fixed wait. Otherwise, it is rendered with args."""
+
+    profile = getattr(callback, 'render_profile', None)
+    if profile is None or profile not in (profiles or {}):
+        return SplashRequest(url, callback=callback, args=args, meta=meta)
+
+    return SplashRequest(url,
+                         callback=callback,
+                         endpoint='execute',
+                         args={
+                             'lua_source': _RENDER_PROFILE_SCRIPT,
+                             'wait_for': profiles[profile].wait_for,
+                             'min_wait': profiles[profile].min_wait,
+                             'max_wait': RENDER_PROFILE_MAX_WAIT,
+                             'allowed_domains': list(allowed_domains),
+                             'timeout': (args or {}).get('timeout', 300),
+                         },
+                         meta=meta)
+
+
+class SplashInstance:
+    """A single Splash instance of the pool, and the requests it is handling."""
+
+    def __init__(self, url):
+        self.url = url if url.endswith('/') else url + '/'
+        self.name = urlparse(self.url).netloc
+        # The requests assigned to this instance that have not been sent yet.
+        self.assigned = 0
+        # The requests sent to this instance that have not been answered yet.
+        self.active = 0
+        self.failures = 0
+        self.healthy = True
+
+    @property
+    def outstanding(self):
+        """The number of requests assigned to this instance and not answered
+        yet."""
+
+        return self.assigned + self.active
+
+
+class SplashPoolMiddleware:
+    """Sends each SplashRequest to the Splash instance in SPLASH_POOL_URLS with
+    the fewest outstanding requests.
+
+    An instance that fails SPLASH_POOL_MAX_FAILURES requests in a row, by
+    refusing connections, timing out or answering 503, is taken out of the
+    pool. Every SPLASH_POOL_HEALTH_CHECK_INTERVAL seconds, every instance is
+    pinged. One that does not answer within SPLASH_POOL_HEALTH_CHECK_TIMEOUT
+    seconds is taken out of the pool, and one out of the pool is put back once
+    it answers. Retried requests to an instance out of the pool are sent to
+    another one. The render latency of
+    each instance is recorded in the stats under splash_pool/<host:port>.
+
+    This must come before SplashMiddleware in DOWNLOADER_MIDDLEWARES. The pool
+    is disabled if SPLASH_POOL_URLS is empty, and SPLASH_URL is used alone."""
+
+    def __init__(self,
+                 urls,
+                 max_failures=3,
+                 health_check_interval=30,
+                 health_check_timeout=10,
+                 stats=None):
+        if not urls:
+            raise NotConfigured
+        self.instances = {
+            instance.url: instance
+            for instance in (SplashInstance(url) for url in urls)
+        }
+        self.max_failures = max_failures
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.stats = stats
+        self._health_check = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Creates the middleware from the settings of the crawler."""
+
+        settings = crawler.settings
+        middleware = cls(settings.getlist('SPLASH_POOL_URLS'),
+                         max_failures=settings.getint(
+                             'SPLASH_POOL_MAX_FAILURES', 3),
+                         health_check_interval=settings.getfloat(
+                             'SPLASH_POOL_HEALTH_CHECK_INTERVAL', 30),
+                         health_check_timeout=settings.getfloat(
+                             'SPLASH_POOL_HEALTH_CHECK_TIMEOUT', 10),
+                         stats=crawler.stats)
+        crawler.signals.connect(middleware.spider_opened,
+                                signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed,
+                                signal=signals.spider_closed)
+        crawler.signals.connect(middleware.request_reached_downloader,
+                                signal=signals.request_reached_downloader)
+        crawler.signals.connect(middleware.response_downloaded,
+                                signal=signals.response_downloaded)
+        crawler.signals.connect(middleware.request_left_downloader,
+                                signal=signals.request_left_downloader)
+        return middleware
+
+    def spider_opened(self, spider):  # pylint: disable=unused-argument
+        """Starts checking the health of the instances out of the pool."""
+
+        self._health_check = task.LoopingCall(self.check_health)
+        self._health_check.start(self.health_check_interval, now=False)
+
+    def spider_closed(self, spider):  # pylint: disable=unused-argument
+        """Stops the health checks."""
+
+        if self._health_check and self._health_check.running:
+            self._health_check.stop()
+
+    def choose_instance(self):
+        """Returns the healthy instance with the fewest outstanding requests,
+        or any instance with the fewest if none of them are healthy."""
+
+        instances = [i for i in self.instances.values() if i.healthy]
+        return min(instances or self.instances.values(),
+                   key=lambda instance: instance.outstanding)
+
+    def process_request(self, request, spider):  # pylint: disable=unused-argument
+        """Assigns Splash requests to an instance before SplashMiddleware
+        builds them, and sends retries to instances out of the pool to another
+        one."""
+
+        splash_options = request.meta.get('splash')
+        if not splash_options:
+            return None
+
+        if not request.meta.get('_splash_processed'):
+            instance = self.choose_instance()
+            splash_options['splash_url'] = instance.url
+            request.meta['_splash_pool_assigned'] = instance.url
+            instance.assigned += 1
+            return None
+
+        instance = self._instance(request)
+        if instance is None:
+            return None
+        if request.meta.pop('_splash_pool_assigned', None):
+            instance.assigned -= 1
+        elif not instance.healthy:
+            # A retry of a request to an instance that has left the pool.
+            replacement = self.choose_instance()
+            if replacement is not instance:
+                splash_options['splash_url'] = replacement.url
+                request.meta['_splash_pool_assigned'] = replacement.url
+                replacement.assigned += 1
+                return request.replace(url=urljoin(replacement.url,
+                                                   splash_options['endpoint']),
+                                       dont_filter=True)
+        return None
+
+    def request_reached_downloader(self, request, spider):  # pylint: disable=unused-argument
+        """Tracks a request sent to an instance. Responses served from the
+        cache never get here."""
+
+        instance = self._instance(request)
+        if instance is not None:
+            instance.active += 1
+            request.meta['_splash_pool_sent_at'] = time.monotonic()
+
+    def response_downloaded(self, response, request, spider):  # pylint: disable=unused-argument
+        """Notes the status of the response to a request sent to an
+        instance."""
+
+        if '_splash_pool_sent_at' in request.meta:
+            request.meta['_splash_pool_status'] = response.status
+
+    def request_left_downloader(self, request, spider):  # pylint: disable=unused-argument
+        """Records the latency of the instance the request was sent to, or a
+        failure if it did not answer or answered 503."""
+
+        sent_at = request.meta.pop('_splash_pool_sent_at', None)
+        if sent_at is None:
+            return
+        status = request.meta.pop('_splash_pool_status', None)
+        instance = self._instance(request)
+        instance.active -= 1
+        self._inc_stat(instance, 'requests')
+
+        if status is not None and status not in _FAILURE_STATUSES:
+            instance.failures = 0
+            self._record_latency(instance, time.monotonic() - sent_at)
+            return
+
+        instance.failures += 1
+        self._inc_stat(instance, 'failures')
+        if instance.failures >= self.max_failures:
+            self._remove(instance, f'failed {instance.failures} times')
+
+    def check_health(self):
+        """Pings each instance, takes the ones that do not answer in time out
+        of the pool, and puts the ones out of the pool that answer back."""
+
+        agent = Agent(reactor)
+        for instance in self.instances.values():
+            deferred = agent.request(b'GET',
+                                     urljoin(instance.url, '_ping').encode())
+            deferred.addTimeout(self.health_check_timeout, reactor)
+            deferred.addCallback(self._check_ping, instance)
+            deferred.addErrback(self._ping_failed, instance)
+
+    def _check_ping(self, response, instance):
+        deferred = readBody(response)
+        if response.code != 200:
+            self._remove(instance, f'answered its ping with {response.code}')
+        elif not instance.healthy:
+            instance.healthy = True
+            instance.failures = 0
+            logging.info('Splash instance %s is back in the pool',
+                         instance.name)
+            self._inc_stat(instance, 'recoveries')
+        return deferred
+
+    def _ping_failed(self, failure, instance):  # pylint: disable=unused-argument
+        self._remove(instance, 'did not answer its ping')
+
+    def _remove(self, instance, reason):
+        if not instance.healthy:
+            return
+        instance.healthy = False
+        logging.warning('Splash instance %s %s, taking it out of the pool',
+                        instance.name, reason)
+        self._inc_stat(instance, 'removals')
+
+    def _instance(self, request):
+        if not request.meta.get('_splash_processed'):
+            return None
+        return self.instances.get(request.meta['splash'].get('splash_url'))
+
+    def _inc_stat(self, instance, name):
+        if self.stats:
+            self.stats.inc_value(f'splash_pool/{instance.name}/{name}')
+
+    def _record_latency(self, instance, seconds):
+        if not self.stats:
+            return
+        name = f'splash_pool/{instance.name}/latency'
+        bucket = next(
+            (f'le_{bound}s' for bound in _LATENCY_BUCKETS if seconds <= bound),
+            'gt_{}s'.format(_LATENCY_BUCKETS[-1]))
+        self.stats.inc_value(f'{name}/{bucket}')
+        self.stats.inc_value(f'{name}/total_seconds', seconds)
+        self.stats.max_value(f'{name}/max_seconds', seconds)
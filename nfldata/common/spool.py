@@ -0,0 +1,102 @@
+"""Defines common utilities needed to spool rows to disk and read them back.
+
+A spool is an append-only file of gzip members, each of which holds a batch of
+rows as lines of JSON, in the form [table, row]. A batch is only written once
+it is complete, and is fsynced before the next one is started, so a crash can
+at most leave a torn batch at the end of the spool. Readers skip it."""
+import json
+import logging
+import os
+import time
+import zlib
+
+# The directory that spools are written to.
+SPOOL_DIRECTORY = 'spool'
+
+# Makes zlib read and write gzip headers and trailers.
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+# The number of bytes to read from a spool at a time.
+_READ_SIZE = 1 << 20
+
+
+class SpoolWriter:
+    """Appends rows to a spool, writing and fsyncing them in batches of at most
+    batch_size rows, or after batch_interval seconds, whichever comes
+    first."""
+
+    def __init__(self, path, batch_size=1000, batch_interval=5):
+        self.path = path
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.rows_written = 0
+        self._lines = []
+        self._last_sync = time.monotonic()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'ab')  # pylint: disable=consider-using-with
+
+    def write(self, table, row):
+        """Buffers a single row of the given table, and writes the batch if it
+        is due."""
+
+        self._lines.append(
+            json.dumps([table, row], separators=(',', ':')).encode() + b'\n')
+        if (len(self._lines) >= self.batch_size or
+                time.monotonic() - self._last_sync >= self.batch_interval):
+            self.sync()
+
+    def sync(self):
+        """Writes the buffered rows as one batch, and waits until they are on
+        disk."""
+
+        self._last_sync = time.monotonic()
+        if not self._lines:
+            return
+
+        compressor = zlib.compressobj(wbits=_GZIP_WBITS)
+        self._file.write(
+            compressor.compress(b''.join(self._lines)) + compressor.flush())
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.rows_written += len(self._lines)
+        self._lines = []
+
+    def close(self):
+        """Writes the remaining rows and closes the spool."""
+
+        self.sync()
+        self._file.close()
+
+
+def read_spool(path):
+    """Yields each (table, row) in the spool at the given path, in the order
+    they were written. A torn or corrupt batch at the end of the spool is
+    skipped with a warning."""
+
+    with open(path, 'rb') as spool:
+        decompressor = zlib.decompressobj(_GZIP_WBITS)
+        batch = []
+        data = b''
+        while True:
+            if not data:
+                data = spool.read(_READ_SIZE)
+                if not data:
+                    break
+            try:
+                batch.append(decompressor.decompress(data))
+            except zlib.error:
+                logging.warning('Skipping a corrupt batch at the end of %s',
+                                path)
+                return
+            data = decompressor.unused_data
+            if decompressor.eof:
+                for line in b''.join(batch).splitlines():
+                    table, row = json.loads(line)
+                    yield table, row
+                decompressor = zlib.decompressobj(_GZIP_WBITS)
+                batch = []
+
+    if batch:
+        logging.warning('Skipping a torn batch at the end of %s', path)
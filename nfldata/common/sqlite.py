@@ -0,0 +1,245 @@
+"""Defines common utilities needed to read and write the SQLite database."""
+import re
+import sqlite3
+
+# The database that the spiders write to, and that the API and notebooks read.
+DATABASE_PATH = 'nfldata.sqlite'
+
+# Named sets of pragmas to apply to new connections. WAL journaling lets the
+# API and notebooks keep reading the database while a spider is writing to it.
+SQLITE_PROFILES = {
+    # For the spiders, which write large batches of rows. Automatic
+    # checkpoints are disabled, because the writer checkpoints periodically
+    # instead of in the middle of a batch.
+    'bulk_load': (
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('cache_size', -262144),
+        ('temp_store', 'MEMORY'),
+        ('mmap_size', 268435456),
+        ('wal_autocheckpoint', 0),
+        ('busy_timeout', 30000),
+    ),
+    # For the API and notebooks, which mostly run queries.
+    'read_heavy': (
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('cache_size', -65536),
+        ('temp_store', 'MEMORY'),
+        ('mmap_size', 1073741824),
+        ('busy_timeout', 5000),
+    ),
+}
+
+
+def connect(profile='read_heavy', path=DATABASE_PATH, **kwargs):
+    """Opens a connection to the SQLite database at path, tuned according to
+    the named profile in SQLITE_PROFILES. Any other keyword arguments are
+    passed on to sqlite3.connect."""
+
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f'Unknown SQLite profile: {profile}')
+
+    database = sqlite3.connect(path, **kwargs)
+    for pragma, value in SQLITE_PROFILES[profile]:
+        database.execute(f'PRAGMA {pragma} = {value}')
+    return database
+
+
+def checkpoint(database, mode='PASSIVE'):
+    """Checkpoints the write-ahead log of the given database, and returns the
+    number of pages in the log and the number of pages checkpointed. This does
+    nothing if the database is not in WAL mode."""
+
+    _, log_pages, checkpointed_pages = database.execute(
+        f'PRAGMA wal_checkpoint({mode})').fetchone()
+    return log_pages, checkpointed_pages
+
+
+def database_size(database):
+    """Returns the size of the given database in bytes, including any pages
+    that are still in the write-ahead log."""
+
+    [page_count] = database.execute('PRAGMA page_count').fetchone()
+    [page_size] = database.execute('PRAGMA page_size').fetchone()
+    return page_count * page_size
+
+
+def table_size(database, table):
+    """Returns the number of bytes used by the given table and its indexes, or
+    None if SQLite was built without the dbstat virtual table."""
+
+    names = [
+        name for (name,) in database.execute(
+            'SELECT name FROM sqlite_master WHERE tbl_name = ?', (table,))
+    ]
+    try:
+        return sum(
+            database.execute(
+                'SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name = ?', (
+                    name,)).fetchone()[0] for name in names)
+    except sqlite3.OperationalError:
+        return None
+
+
+def insert_statement(table, columns):
+    """Returns an INSERT OR REPLACE statement for the given table with one
+    placeholder for each of the given columns."""
+
+    return 'INSERT OR REPLACE INTO {} ({}) VALUES ({})'.format(
+        table, ', '.join(columns), ', '.join('?' for _ in columns))
+
+
+def primary_key_columns(database, table, schema='main'):
+    """Returns the names of the columns in the primary key of the given table,
+    in key order."""
+
+    columns = [(pk, name) for _, name, _, _, _, pk in database.execute(
+        f'PRAGMA {schema}.table_info({table})') if pk]
+    return tuple(name for _, name in sorted(columns))
+
+
+def upsert_rows(database, table, columns, key_columns, rows):
+    """Writes the given rows to the table, skipping any row whose values are
+    already stored. Unlike INSERT OR REPLACE, existing rows are updated in
+    place, so unchanged rows are not deleted and reinserted.
+
+    Returns the number of rows that were inserted and updated. Any other rows
+    were unchanged."""
+
+    inserted = database.executemany(
+        'INSERT OR IGNORE INTO {} ({}) VALUES ({})'.format(
+            table, ', '.join(columns), ', '.join('?' for _ in columns)),
+        rows).rowcount
+
+    value_columns = [c for c in columns if c not in key_columns]
+    if not value_columns:
+        return inserted, 0
+
+    updated = database.executemany(
+        '''
+        UPDATE {} SET {}
+        WHERE {} AND ({})
+    '''.format(table, ', '.join(f'{c} = :{c}' for c in value_columns),
+               ' AND '.join(f'{c} = :{c}' for c in key_columns),
+               ' OR '.join(f'{c} IS NOT :{c}' for c in value_columns)),
+        [dict(zip(columns, row)) for row in rows]).rowcount
+    return inserted, updated
+
+
+def index_name(table, columns):
+    """Returns the name of the index over the given columns of the table."""
+
+    return '_'.join((table, 'by') + tuple(columns))
+
+
+def create_indexes(database, table, indexes):
+    """Creates each of the given indexes on the table if it does not already
+    exist. Each index is a tuple of column names."""
+
+    for columns in indexes:
+        database.execute('CREATE INDEX IF NOT EXISTS {} ON {} ({})'.format(
+            index_name(table, columns), table, ', '.join(columns)))
+
+
+def missing_indexes(database, table, indexes):
+    """Returns the given indexes that do not exist on the table."""
+
+    existing = {
+        name for (name,) in database.execute(
+            '''
+            SELECT name FROM sqlite_master
+            WHERE type = 'index' AND tbl_name = ?
+        ''', (table,))
+    }
+    return [
+        columns for columns in indexes
+        if index_name(table, columns) not in existing
+    ]
+
+
+def table_exists(database, table, schema='main'):
+    """Returns whether the given table exists in the database."""
+
+    return database.execute(
+        f'''
+        SELECT 1 FROM {schema}.sqlite_master
+        WHERE type = 'table' AND name = ?
+    ''', (table,)).fetchone() is not None
+
+
+def create_staging_table(database, table, resume=False):
+    """Creates an empty staging table with the same columns as the given table,
+    but without any of its constraints or indexes, and returns its name. Any
+    staging table left behind by an earlier run is dropped first, unless resume
+    is set, in which case its rows are kept and appended to."""
+
+    staging_table = f'{table}_staging'
+    if resume and table_exists(database, staging_table):
+        return staging_table
+    database.execute(f'DROP TABLE IF EXISTS {staging_table}')
+    database.execute(
+        f'CREATE TABLE {staging_table} AS SELECT * FROM {table} WHERE 0')
+    return staging_table
+
+
+def swap_in_staging_tables(database, staging_tables, keep_rows=False):
+    """Replaces each table in staging_tables, which maps tables to their
+    staging tables, with the rows loaded into its staging table. All of the
+    tables are replaced in a single transaction, so readers see either the old
+    rows of every table or the new ones.
+
+    The rows are copied into a new table with the original table's schema, and
+    the original table's indexes are then created once over the loaded rows.
+    If a row was staged more than once, the last one wins. If keep_rows is set,
+    the table's existing rows are copied first, so only the rows that were
+    staged again are replaced."""
+
+    database.commit()
+    # Keep ALTER TABLE from checking views that refer to the tables while they
+    # are dropped.
+    database.execute('PRAGMA legacy_alter_table = ON')
+    try:
+        database.execute('BEGIN')
+        for table, staging_table in staging_tables.items():
+            _swap_staging_table(database, table, staging_table, keep_rows)
+        database.commit()
+    except Exception:
+        database.rollback()
+        raise
+    finally:
+        database.execute('PRAGMA legacy_alter_table = OFF')
+
+
+def _swap_staging_table(database, table, staging_table, keep_rows):
+    [schema] = database.execute(
+        '''
+        SELECT sql FROM sqlite_master
+        WHERE type = 'table' AND name = ?
+    ''', (table,)).fetchone()
+    indexes = [
+        sql for (sql,) in database.execute(
+            '''
+            SELECT sql FROM sqlite_master
+            WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL
+        ''', (table,))
+    ]
+    new_table = f'{table}_new'
+    schema = re.sub(r'^CREATE TABLE "?[^\s"(]+"?',
+                    f'CREATE TABLE {new_table}',
+                    schema,
+                    count=1)
+
+    database.execute(f'DROP TABLE IF EXISTS {new_table}')
+    database.execute(schema)
+    if keep_rows:
+        database.execute(f'INSERT INTO {new_table} SELECT * FROM {table}')
+    database.execute(f'''
+        INSERT OR REPLACE INTO {new_table}
+        SELECT * FROM {staging_table} ORDER BY rowid
+    ''')
+    database.execute(f'DROP TABLE {table}')
+    database.execute(f'ALTER TABLE {new_table} RENAME TO {table}')
+    for index in indexes:
+        database.execute(index)
+    database.execute(f'DROP TABLE {staging_table}')
@@ -0,0 +1,27 @@
+"""Defines the items that the spiders scrape, and how they are stored in
+SQLite.
+
+Each stored item class declares its table in sql_table, the columns it writes
+in sql_columns, and optionally the secondary indexes to create on the table in
+sql_indexes, as tuples of column names. For the compact schema in
+nfldata.analysis.schema_v2, sql_links names the columns that hold links to Pro
+Football Reference, and sql_enums maps the columns that hold enum names to their
+Enum classes."""
+import importlib
+import pkgutil
+import scrapy
+
+
+def sql_item_classes():
+    """Returns all of the item classes in this package that are stored in
+    SQLite."""
+
+    item_classes = []
+    for module_info in pkgutil.iter_modules(__path__):
+        module = importlib.import_module(f'{__name__}.{module_info.name}')
+        for value in vars(module).values():
+            if (isinstance(value, type) and issubclass(value, scrapy.Item) and
+                    value.__module__ == module.__name__ and
+                    hasattr(value, 'sql_table')):
+                item_classes.append(value)
+    return item_classes
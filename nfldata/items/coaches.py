@@ -2,11 +2,16 @@
 from enum import Enum, auto
 from turtle import pos
 import scrapy
+from nfldata.common.sqlite import insert_statement
 
 
 class Coach(scrapy.Item):  # pylint: disable=too-many-ancestors
     """Defines information related to a specific NFL coach."""
 
+    sql_table = 'coaches'
+    sql_columns = ('coach', 'name')
+    sql_links = ('coach',)
+
     # A relative link on Pro Football Reference to the coach.
     coach = scrapy.Field()
 
@@ -26,68 +31,16 @@ class Coach(scrapy.Item):  # pylint: disable=too-many-ancestors
             )
         ''')
 
-    def sql_insert(self, database):
-        """Inserts this coach into the coaches table in the given database."""
-
-        database.execute(
-            '''
-            INSERT OR REPLACE INTO coaches (
-                coach,
-                name
-            ) VALUES (
-                ?,
-                ?
-            )
-        ''', (self['coach'], self['name']))
-
+    def sql_row(self):
+        """Returns the values of this coach in column order."""
 
-class CoachingStaffMember(scrapy.Item):  # pylint: disable=too-many-ancestors
-    """Defines a single coach's membership on a coaching staff."""
-
-    # A relative link on Pro Football Reference to the coach.
-    coach = scrapy.Field()
-
-    # A relative link on Pro Football Reference to the coach's team.
-    team = scrapy.Field()
-
-    # The position of the coach on this team.
-    position = scrapy.Field()
-
-    @staticmethod
-    def sql_create(database):
-        """
-        Creates the coaching_staff_members table if one does not exist in the
-        given databse. Note that this does not update the fields if the table
-        already exists, but the fields are outdated.
-        """
-        database.execute('''
-            CREATE TABLE IF NOT EXISTS coaching_staff_members (
-                coach TEXT,
-                team TEXT,
-                position TEXT,
-                PRIMARY KEY (coach, team),
-                FOREIGN KEY (coach) REFERENCES coaches(coach),
-                FOREIGN KEY (team) REFERENCES teams(team)
-            )
-        ''')
+        return (self['coach'], self['name'])
 
     def sql_insert(self, database):
-        """
-        Insert this coach into the coaching_staff_members table in the given
-        database.
-        """
-        database.execute(
-            '''
-            INSERT OR REPLACE INTO coaching_staff_members (
-                coach,
-                team,
-                position
-            ) VALUES (
-                ?,
-                ?,
-                ?
-            )
-            ''', (self['coach'], self['team'], self['position'].name))
+        """Inserts this coach into the coaches table in the given database."""
+
+        database.execute(insert_statement(self.sql_table, self.sql_columns),
+                         self.sql_row())
 
 
 class CoachingPosition(Enum):
@@ -128,6 +81,58 @@ class CoachingPosition(Enum):
     OTHER_ASSISTANT = auto()
 
 
+class CoachingStaffMember(scrapy.Item):  # pylint: disable=too-many-ancestors
+    """Defines a single coach's membership on a coaching staff."""
+
+    sql_table = 'coaching_staff_members'
+    sql_columns = ('coach', 'team', 'position')
+    # Covers joining coaching staffs to teams.
+    sql_indexes = (('team', 'coach', 'position'),)
+    sql_links = ('coach', 'team')
+    sql_enums = {'position': CoachingPosition}
+
+    # A relative link on Pro Football Reference to the coach.
+    coach = scrapy.Field()
+
+    # A relative link on Pro Football Reference to the coach's team.
+    team = scrapy.Field()
+
+    # The position of the coach on this team.
+    position = scrapy.Field()
+
+    @staticmethod
+    def sql_create(database):
+        """
+        Creates the coaching_staff_members table if one does not exist in the
+        given databse. Note that this does not update the fields if the table
+        already exists, but the fields are outdated.
+        """
+        database.execute('''
+            CREATE TABLE IF NOT EXISTS coaching_staff_members (
+                coach TEXT,
+                team TEXT,
+                position TEXT,
+                PRIMARY KEY (coach, team),
+                FOREIGN KEY (coach) REFERENCES coaches(coach),
+                FOREIGN KEY (team) REFERENCES teams(team)
+            )
+        ''')
+
+    def sql_row(self):
+        """Returns the values of this membership in column order."""
+
+        return (self['coach'], self['team'], self['position'].name)
+
+    def sql_insert(self, database):
+        """
+        Insert this coach into the coaching_staff_members table in the given
+        database.
+        """
+
+        database.execute(insert_statement(self.sql_table, self.sql_columns),
+                         self.sql_row())
+
+
 # Common typos and substitutions necessary to parse coaching positions from Pro
 # Football Reference.
 PFR_COACHING_POSITION_SUBSTITUTIONS = {
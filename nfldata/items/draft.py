@@ -1,6 +1,7 @@
 """ Defines items related to the NFL draft."""
 from enum import Enum, auto
 import scrapy
+from nfldata.common.sqlite import insert_statement
 
 
 class DraftType(Enum):
@@ -15,6 +16,16 @@ class DraftPick(scrapy.Item):  # pylint: disable=too-many-ancestors
     Defines a single draft pick in a particular NFL draft.
     """
 
+    sql_table = 'draft_picks'
+    sql_columns = ('year', 'draft_type', 'draft_round', 'draft_pick',
+                   'franchise', 'player', 'age', 'first_team_all_pros',
+                   'pro_bowls', 'career_approx_value', 'draft_approx_value',
+                   'college')
+    # Covers joining picks to teams by franchise and year, and to players.
+    sql_indexes = (('franchise', 'year'), ('player',))
+    sql_links = ('franchise', 'player', 'college')
+    sql_enums = {'draft_type': DraftType}
+
     # The year in which the draft itself occurred.
     year = scrapy.Field()
 
@@ -84,41 +95,19 @@ class DraftPick(scrapy.Item):  # pylint: disable=too-many-ancestors
             )
         ''')
 
+    def sql_row(self):
+        """Returns the values of this draft pick in column order."""
+
+        return (self['year'], self['draft_type'].name, self['draft_round'],
+                self['draft_pick'], self['franchise'], self['player'],
+                self['age'], self['first_team_all_pros'], self['pro_bowls'],
+                self['career_approx_value'], self['draft_approx_value'],
+                self['college'])
+
     def sql_insert(self, database):
         """
         Insert this draft pick into the draft_picks table in the given database.
         """
-        database.execute(
-            '''
-            INSERT OR REPLACE INTO draft_picks (
-                year,
-                draft_type,
-                draft_round,
-                draft_pick,
-                franchise,
-                player,
-                age,
-                first_team_all_pros,
-                pro_bowls,
-                career_approx_value,
-                draft_approx_value,
-                college
-            ) VALUES (
-                ?,
-                ?,
-                ?,
-                ?,
-                ?,
-                ?,
-                ?,
-                ?,
-                ?,
-                ?,
-                ?,
-                ?
-            )
-        ''', (self['year'], self['draft_type'].name, self['draft_round'],
-              self['draft_pick'], self['franchise'], self['player'],
-              self['age'], self['first_team_all_pros'], self['pro_bowls'],
-              self['career_approx_value'], self['draft_approx_value'],
-              self['college']))
+
+        database.execute(insert_statement(self.sql_table, self.sql_columns),
+                         self.sql_row())
@@ -1,11 +1,16 @@
 """Defines items related to NFL executives."""
 
 import scrapy
+from nfldata.common.sqlite import insert_statement
 
 
 class Executive(scrapy.Item):  # pylint: disable=too-many-ancestors
     """Defines information related to a specific NFL executive."""
 
+    sql_table = 'executives'
+    sql_columns = ('executive', 'name')
+    sql_links = ('executive',)
+
     # A relative link on Pro Football Reference to the executive.
     executive = scrapy.Field()
 
@@ -25,25 +30,28 @@ class Executive(scrapy.Item):  # pylint: disable=too-many-ancestors
             ) 
         ''')
 
+    def sql_row(self):
+        """Returns the values of this executive in column order."""
+
+        return (self['executive'], self['name'])
+
     def sql_insert(self, database):
         """Inserts this executive into the executives table in the given
         database."""
 
-        database.execute(
-            '''
-            INSERT OR REPLACE INTO executives (
-                executive,
-                name
-            ) VALUES (
-                ?,
-                ?
-            )
-            ''', (self['executive'], self['name']))
+        database.execute(insert_statement(self.sql_table, self.sql_columns),
+                         self.sql_row())
 
 
 class FrontOfficeMember(scrapy.Item):  # pylint: disable=too-many-ancestors
     """Defines a single executive's membership on a front office."""
 
+    sql_table = 'front_office_members'
+    sql_columns = ('executive', 'team', 'title')
+    # Covers joining front offices to teams and rosters.
+    sql_indexes = (('team', 'executive', 'title'),)
+    sql_links = ('executive', 'team')
+
     # A relative link on Pro Football Reference to the executive.
     executive = scrapy.Field()
 
@@ -69,20 +77,16 @@ class FrontOfficeMember(scrapy.Item):  # pylint: disable=too-many-ancestors
             )
         ''')
 
+    def sql_row(self):
+        """Returns the values of this membership in column order."""
+
+        return (self['executive'], self['team'], self['title'])
+
     def sql_insert(self, database):
         """
         Insert this executive into the front_office_members table in the given
         database.
         """
-        database.execute(
-            '''
-            INSERT OR REPLACE INTO front_office_members (
-                executive,
-                team,
-                title
-            ) VALUES (
-                ?,
-                ?,
-                ?
-            )
-            ''', (self['executive'], self['team'], self['title']))
+
+        database.execute(insert_statement(self.sql_table, self.sql_columns),
+                         self.sql_row())
@@ -1,6 +1,7 @@
 """Defines the items related to player injuries."""
 from enum import Enum, auto
 import scrapy
+from nfldata.common.sqlite import insert_statement
 
 
 class InjuryType(Enum):
@@ -130,6 +131,14 @@ class InjuryOutcome(Enum):
 class Injury(scrapy.Item):  # pylint: disable=too-many-ancestors
     """Defines an injury for a player in a specifc week of the season."""
 
+    sql_table = 'injuries'
+    sql_columns = ('player', 'team', 'week', 'status', 'outcome')
+    # Covers looking injuries up by team. The primary key already covers
+    # joining them to injury_reasons.
+    sql_indexes = (('team', 'week'),)
+    sql_links = ('player', 'team')
+    sql_enums = {'status': InjuryStatus, 'outcome': InjuryOutcome}
+
     # A relative link on Pro Football Reference to the player.
     player = scrapy.Field()
 
@@ -167,32 +176,30 @@ class Injury(scrapy.Item):  # pylint: disable=too-many-ancestors
             )
         ''')
 
+    def sql_row(self):
+        """Returns the values of this injury report in column order."""
+
+        return (self['player'], self['team'], self['week'], self['status'].name,
+                self['outcome'].name)
+
     def sql_insert(self, database):
         """Insert this injury report into the injuries table."""
 
-        database.execute(
-            '''
-            INSERT OR REPLACE INTO injuries (
-                player,
-                team,
-                week,
-                status,
-                outcome
-            ) VALUES (
-                ?,
-                ?,
-                ?,
-                ?,
-                ?
-            )
-        ''', (self['player'], self['team'], self['week'], self['status'].name,
-              self['outcome'].name))
+        database.execute(insert_statement(self.sql_table, self.sql_columns),
+                         self.sql_row())
 
 
 class InjuryReason(scrapy.Item):  # pylint: disable=too-many-ancestors
     """Defines a reason that a player is missing for a week. There could be
     multiple reasons."""
 
+    sql_table = 'injury_reasons'
+    sql_columns = ('player', 'team', 'week', 'reason')
+    # Covers grouping by reason.
+    sql_indexes = (('reason',),)
+    sql_links = ('player', 'team')
+    sql_enums = {'reason': InjuryType}
+
     # A relative link on Pro Football Reference to the player.
     player = scrapy.Field()
 
@@ -232,23 +239,16 @@ class InjuryReason(scrapy.Item):  # pylint: disable=too-many-ancestors
             )
         ''')
 
+    def sql_row(self):
+        """Returns the values of this injury reason in column order."""
+
+        return (self['player'], self['team'], self['week'], self['reason'].name)
+
     def sql_insert(self, database):
         """Insert this injury reason into the injuries table."""
 
-        database.execute(
-            '''
-            INSERT OR REPLACE INTO injury_reasons (
-                player,
-                team,
-                week,
-                reason
-            ) VALUES (
-                ?,
-                ?,
-                ?,
-                ?
-            )
-        ''', (self['player'], self['team'], self['week'], self['reason'].name))
+        database.execute(insert_statement(self.sql_table, self.sql_columns),
+                         self.sql_row())
 
 
 # Common typos and substitutions necessary to parse injury reasons from Pro
@@ -1,6 +1,7 @@
 """Defines items related to NFL players."""
 from enum import Enum, auto
 import scrapy
+from nfldata.common.sqlite import insert_statement
 
 
 class PlayerType(Enum):
@@ -29,6 +30,11 @@ class PlayerType(Enum):
 class Player(scrapy.Item):  # pylint: disable=too-many-ancestors
     """Defines a single player who has played in the NFL."""
 
+    sql_table = 'players'
+    sql_columns = ('player', 'name', 'first_team_all_pros', 'pro_bowls',
+                   'career_approx_value')
+    sql_links = ('player',)
+
     # A relative link on Pro Football Reference to the player.
     player = scrapy.Field()
 
@@ -58,33 +64,30 @@ class Player(scrapy.Item):  # pylint: disable=too-many-ancestors
             )
         ''')
 
+    def sql_row(self):
+        """Returns the values of this player in column order."""
+
+        return (self['player'], self['name'], self['first_team_all_pros'],
+                self['pro_bowls'], self['career_approx_value'])
+
     def sql_insert(self, database):
         """
         Insert this player into the players table in the given database.
         """
-        database.execute(
-            '''
-            INSERT OR REPLACE INTO players (
-                player,
-                name,
-                first_team_all_pros,
-                pro_bowls,
-                career_approx_value
-            ) VALUES (
-                ?,
-                ?,
-                ?,
-                ?,
-                ?
-            )
-        ''', (self['player'], self['name'], self['first_team_all_pros'],
-              self['pro_bowls'], self['career_approx_value']))
+
+        database.execute(insert_statement(self.sql_table, self.sql_columns),
+                         self.sql_row())
 
 
 class PlayerPosition(scrapy.Item):  # pylint: disable=too-many-ancestors
     """Defines a position played by a player. It is possible for a player to
     play multiple positions, so a single player may yield multiple items."""
 
+    sql_table = 'player_positions'
+    sql_columns = ('player', 'position')
+    sql_links = ('player',)
+    sql_enums = {'position': PlayerType}
+
     # A relative link on Pro Football Reference to the player.
     player = scrapy.Field()
 
@@ -106,20 +109,18 @@ class PlayerPosition(scrapy.Item):  # pylint: disable=too-many-ancestors
             )
         ''')
 
+    def sql_row(self):
+        """Returns the values of this player position in column order."""
+
+        return (self['player'], self['position'].name)
+
     def sql_insert(self, database):
         """
         Insert this item into the player_positions table.
         """
-        database.execute(
-            '''
-            INSERT OR REPLACE INTO player_positions (
-                player,
-                position
-            ) VALUES (
-                ?,
-                ?
-            )
-        ''', (self['player'], self['position'].name))
+
+        database.execute(insert_statement(self.sql_table, self.sql_columns),
+                         self.sql_row())
 
 
 PFR_POSITION_CODES_TRANSLATIONS = {
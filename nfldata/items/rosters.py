@@ -1,10 +1,19 @@
 """Defines items related to NFL rosters."""
 import scrapy
+from nfldata.common.sqlite import insert_statement
 
 
 class RosterMember(scrapy.Item):  # pylint: disable=too-many-ancestors
     """Defines a single player's membership on a particular team's roster."""
 
+    sql_table = 'roster_members'
+    sql_columns = ('player', 'team', 'approximate_value', 'pro_bowl',
+                   'first_team_all_pro')
+    # Covers joining rosters to front offices and coaching staffs by team.
+    sql_indexes = (('team', 'player', 'pro_bowl', 'first_team_all_pro',
+                    'approximate_value'),)
+    sql_links = ('player', 'team')
+
     # A relative link on Pro Football Reference to the player.
     player = scrapy.Field()
 
@@ -40,25 +49,17 @@ class RosterMember(scrapy.Item):  # pylint: disable=too-many-ancestors
             )
         ''')
 
+    def sql_row(self):
+        """Returns the values of this roster member in column order."""
+
+        return (self['player'], self['team'], self['approximate_value'],
+                int(self['pro_bowl']), int(self['first_team_all_pro']))
+
     def sql_insert(self, database):
         """
         Insert this roster member into the roster_members table in the given
         database.
         """
-        database.execute(
-            '''
-            INSERT OR REPLACE INTO roster_members (
-                player,
-                team,
-                approximate_value,
-                pro_bowl,
-                first_team_all_pro
-            ) VALUES (
-                ?,
-                ?,
-                ?,
-                ?,
-                ?
-            )
-        ''', (self['player'], self['team'], self['approximate_value'],
-              int(self['pro_bowl']), int(self['first_team_all_pro'])))
+
+        database.execute(insert_statement(self.sql_table, self.sql_columns),
+                         self.sql_row())
@@ -1,10 +1,15 @@
 """Defines items related to schools that NFL players have attended."""
 import scrapy
+from nfldata.common.sqlite import insert_statement
 
 
 class School(scrapy.Item):  # pylint: disable=too-many-ancestors
     """Defines a school that has produced at least one NFL player."""
 
+    sql_table = 'schools'
+    sql_columns = ('school', 'name')
+    sql_links = ('school',)
+
     # A relative link on Pro Football Reference to the college.
     school = scrapy.Field()
 
@@ -27,18 +32,15 @@ class School(scrapy.Item):  # pylint: disable=too-many-ancestors
             )
         ''')
 
+    def sql_row(self):
+        """Returns the values of this school in column order."""
+
+        return (self['school'], self['name'])
+
     def sql_insert(self, database):
         """
         Insert this school into the schools table in the given database.
         """
 
-        database.execute(
-            '''
-            insert or replace into schools (
-                school,
-                name
-            ) values (
-                ?,
-                ?
-            )
-        ''', (self['school'], self['name']))
+        database.execute(insert_statement(self.sql_table, self.sql_columns),
+                         self.sql_row())
@@ -1,9 +1,14 @@
 import scrapy
+from nfldata.common.sqlite import insert_statement
 
 
 class Stadium(scrapy.Item):  # pylint: disable=too-many-ancestors
     """Defines information related to a stadium that an NFL team plays at."""
 
+    sql_table = 'stadiums'
+    sql_columns = ('stadium', 'name', 'city', 'state')
+    sql_links = ('stadium',)
+
     # A relative link on Pro Football Reference to this stadium.
     stadium = scrapy.Field()
 
@@ -31,28 +36,27 @@ class Stadium(scrapy.Item):  # pylint: disable=too-many-ancestors
             )
         ''')
 
+    def sql_row(self):
+        """Returns the values of this stadium in column order."""
+
+        return (self['stadium'], self['name'], self['city'], self['state'])
+
     def sql_insert(self, database):
         """Inserts this stadium into the stadiums table in the given database."""
 
-        database.execute(
-            '''
-            INSERT OR REPLACE INTO stadiums (
-                stadium,
-                name,
-                city,
-                state
-            ) VALUES (
-                ?,
-                ?,
-                ?,
-                ?
-            )
-            ''', (self['stadium'], self['name'], self['city'], self['state']))
+        database.execute(insert_statement(self.sql_table, self.sql_columns),
+                         self.sql_row())
 
 
 class StadiumMember(scrapy.Item):  # pylint: disable=too-many-ancestors
     """Defines a single team's membership at a particular stadium."""
 
+    sql_table = 'stadium_members'
+    sql_columns = ('stadium', 'team')
+    # Covers looking up the stadium of a team.
+    sql_indexes = (('team',),)
+    sql_links = ('stadium', 'team')
+
     # A relative link on Pro Football Reference to the stadium.
     stadium = scrapy.Field()
 
@@ -75,25 +79,25 @@ class StadiumMember(scrapy.Item):  # pylint: disable=too-many-ancestors
             )
         ''')
 
+    def sql_row(self):
+        """Returns the values of this stadium membership in column order."""
+
+        return (self['stadium'], self['team'])
+
     def sql_insert(self, database):
         """Inserts this item into the stadium_members table in the given
         database."""
 
-        database.execute(
-            '''
-            INSERT OR REPLACE INTO stadium_members (
-                stadium,
-                team
-            ) VALUES (
-                ?,
-                ?
-            )
-        ''', (self['stadium'], self['team']))
+        database.execute(insert_statement(self.sql_table, self.sql_columns),
+                         self.sql_row())
 
 
 class CityElevation(scrapy.Item):  # pylint: disable=too-many-ancestors
     """Defines the elevation of a city that a team plays in."""
 
+    sql_table = 'city_elevations'
+    sql_columns = ('city', 'state', 'elevation')
+
     # The city name.
     city = scrapy.Field()
 
@@ -118,19 +122,14 @@ class CityElevation(scrapy.Item):  # pylint: disable=too-many-ancestors
             )
         ''')
 
+    def sql_row(self):
+        """Returns the values of this city elevation in column order."""
+
+        return (self['city'], self['state'], self['elevation'])
+
     def sql_insert(self, database):
         """Inserts this item into the city_elevations table in the given
         database."""
 
-        database.execute(
-            '''
-            INSERT OR REPLACE INTO city_elevations (
-                city,
-                state,
-                elevation
-            ) VALUES (
-                ?,
-                ?,
-                ?
-            )
-        ''', (self['city'], self['state'], self['elevation']))
+        database.execute(insert_statement(self.sql_table, self.sql_columns),
+                         self.sql_row())
@@ -1,10 +1,15 @@
 """Defines items related to NFL teams."""
 import scrapy
+from nfldata.common.sqlite import insert_statement
 
 
 class Franchise(scrapy.Item):  # pylint: disable=too-many-ancestors
     """Defines information related to an NFL franchise."""
 
+    sql_table = 'franchises'
+    sql_columns = ('franchise', 'name')
+    sql_links = ('franchise',)
+
     # A relative link on Pro Football Reference to this franchise.
     franchise = scrapy.Field()
 
@@ -28,25 +33,29 @@ class Franchise(scrapy.Item):  # pylint: disable=too-many-ancestors
     def from_sql_cursor(cursor):
         """Given a cursor that already contains selected rows, with both the franchise and name fields, return a set of Franchise items."""
 
+    def sql_row(self):
+        """Returns the values of this franchise in column order."""
+
+        return (self['franchise'], self['name'])
+
     def sql_insert(self, database):
         """Inserts this franchise into the franchises table in the given
         database."""
 
-        database.execute(
-            '''
-            INSERT OR REPLACE INTO franchises (
-                franchise,
-                name
-            ) VALUES (
-                ?,
-                ?
-            )
-            ''', (self['franchise'], self['name']))
+        database.execute(insert_statement(self.sql_table, self.sql_columns),
+                         self.sql_row())
 
 
 class Team(scrapy.Item):  # pylint: disable=too-many-ancestors
     """Defines information related to a specific NFL team in a specific year."""
 
+    sql_table = 'teams'
+    sql_columns = ('team', 'year', 'name', 'franchise', 'regular_season_wins',
+                   'regular_season_losses', 'regular_season_ties')
+    # Covers joining teams to draft picks by franchise and year.
+    sql_indexes = (('franchise', 'year'),)
+    sql_links = ('team', 'franchise')
+
     # A relative link on Pro Football Reference to this team.
     team = scrapy.Field()
 
@@ -82,28 +91,15 @@ class Team(scrapy.Item):  # pylint: disable=too-many-ancestors
             )
         ''')
 
+    def sql_row(self):
+        """Returns the values of this team in column order."""
+
+        return (self['team'], self['year'], self['name'], self['franchise'],
+                self['regular_season_wins'], self['regular_season_losses'],
+                self['regular_season_ties'])
+
     def sql_insert(self, database):
         """Inserts this team into the teams table in the given database."""
 
-        database.execute(
-            '''
-            INSERT OR REPLACE INTO teams (
-                team,
-                year,
-                name,
-                franchise,
-                regular_season_wins,
-                regular_season_losses,
-                regular_season_ties
-            ) VALUES (
-                ?,
-                ?,
-                ?,
-                ?,
-                ?,
-                ?,
-                ?
-            )
-        ''', (self['team'], self['year'], self['name'], self['franchise'],
-              self['regular_season_wins'], self['regular_season_losses'],
-              self['regular_season_ties']))
+        database.execute(insert_statement(self.sql_table, self.sql_columns),
+                         self.sql_row())
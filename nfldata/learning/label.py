@@ -3,9 +3,9 @@
 import os
 import pathlib
 import re
-import sqlite3
 from IPython.display import display
 from ipywidgets import Button, Image, Label, HBox, VBox
+from nfldata.common.sqlite import connect
 
 _FRAME_REGEX = re.compile(
     r'([A-Za-z0-9\s]+)_([A-Za-z0-9\s]+)_([0-9]+)_([0-9]+)_([0-9]+).png')
@@ -16,7 +16,7 @@ class LabelingGui:  # pylint: disable=too-few-public-methods
 
     def __init__(self, directory_to_label, labels, output_labels_file=None):
         self._output_labels_file = output_labels_file if not None else 'labels.db'
-        self._db = sqlite3.connect(self._output_labels_file)
+        self._db = connect('read_heavy', path=self._output_labels_file)
         self._db.execute('''
             CREATE TABLE IF NOT EXISTS labels (path TEXT PRIMARY KEY, label TEXT)
         ''')
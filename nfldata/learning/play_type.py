@@ -3,7 +3,6 @@
 import os
 import pathlib
 import random
-import sqlite3
 
 from fastai.data.block import DataBlock, CategoryBlock
 from fastai.data.transforms import FuncSplitter
@@ -12,6 +11,7 @@ from fastai.vision.augment import Resize, aug_transforms
 from fastai.vision.data import ImageBlock
 from fastai.vision.learner import cnn_learner
 from fastai.vision.models import resnet18
+from nfldata.common.sqlite import connect
 from nfldata.learning.video import video_from_frame_filename
 
 
@@ -26,7 +26,7 @@ def learn_play_type(labels_file,
     if exclude_labels is None:
         exclude_labels = {}
 
-    labels_database = sqlite3.connect(labels_file)
+    labels_database = connect('read_heavy', path=labels_file)
 
     batch_tfms = aug_transforms() if augment else None
     data_block = DataBlock(
@@ -0,0 +1,63 @@
+"""Defines pipelines to export the tables written by a spider to Parquet."""
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from nfldata.common.parquet import EXPORT_DIRECTORY, export_table
+from nfldata.common.sqlite import connect
+
+
+class ParquetExportPipeline:
+    """Exports the table of every item class that the spider produced to
+    Parquet under PARQUET_EXPORT_DIRECTORY once the spider closes. This is
+    only enabled if PARQUET_EXPORT_ENABLED is set.
+
+    The tables are read back from SQLite once the spider_closed signal is sent,
+    after SqlitePipeline has swapped in its staging tables. SqlitePipeline
+    connects to the signal when it is created, and this pipeline only in
+    open_spider, so its handler runs after SqlitePipeline's."""
+
+    def __init__(self,
+                 directory=EXPORT_DIRECTORY,
+                 stats=None,
+                 signal_manager=None):
+        self.directory = directory
+        self.stats = stats
+        self.signal_manager = signal_manager
+        self.item_classes = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Creates the pipeline using the PARQUET_EXPORT_* settings of the
+        crawler."""
+
+        settings = crawler.settings
+        if not settings.getbool('PARQUET_EXPORT_ENABLED', False):
+            raise NotConfigured
+        return cls(directory=settings.get('PARQUET_EXPORT_DIRECTORY',
+                                          EXPORT_DIRECTORY),
+                   stats=crawler.stats,
+                   signal_manager=crawler.signals)
+
+    def open_spider(self, spider):  # pylint: disable=unused-argument
+        """Waits for the spider_closed signal to export the tables."""
+
+        if self.signal_manager:
+            self.signal_manager.connect(self.spider_closed,
+                                        signal=signals.spider_closed)
+
+    def spider_closed(self, spider):  # pylint: disable=unused-argument
+        """Exports the tables of the items that the spider produced."""
+
+        database = connect('read_heavy')
+        for item_class in self.item_classes.values():
+            rows = export_table(database, item_class, self.directory)
+            if self.stats:
+                self.stats.set_value(
+                    f'parquet/rows_exported/{item_class.sql_table}', rows)
+        database.close()
+
+    def process_item(self, item, spider):  # pylint: disable=unused-argument
+        """Records the table of the given item to be exported."""
+
+        if 'sql_row' in dir(item):
+            self.item_classes.setdefault(type(item).sql_table, type(item))
+        return item
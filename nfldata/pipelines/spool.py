@@ -0,0 +1,62 @@
+"""Defines pipelines to spool items to disk before they are stored."""
+import os
+import time
+from scrapy.exceptions import NotConfigured
+from nfldata.common.spool import SPOOL_DIRECTORY, SpoolWriter
+
+
+class SpoolPipeline:
+    """Appends the row of every stored item to a spool file under
+    SPOOL_DIRECTORY, named after the spider and the time it was opened. This is
+    only enabled if SPOOL_ENABLED is set.
+
+    Rows are fsynced in batches of SPOOL_BATCH_SIZE rows, or every
+    SPOOL_BATCH_INTERVAL seconds. If the crawl dies, the spool can be loaded
+    with python -m nfldata.analysis.replay instead of crawling again."""
+
+    def __init__(self,
+                 directory=SPOOL_DIRECTORY,
+                 batch_size=1000,
+                 batch_interval=5,
+                 stats=None):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.stats = stats
+        self.spool = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Creates the pipeline using the SPOOL_* settings of the crawler."""
+
+        settings = crawler.settings
+        if not settings.getbool('SPOOL_ENABLED', False):
+            raise NotConfigured
+        return cls(directory=settings.get('SPOOL_DIRECTORY', SPOOL_DIRECTORY),
+                   batch_size=settings.getint('SPOOL_BATCH_SIZE', 1000),
+                   batch_interval=settings.getfloat('SPOOL_BATCH_INTERVAL', 5),
+                   stats=crawler.stats)
+
+    def open_spider(self, spider):
+        """Opens a new spool for the spider."""
+
+        name = '{}-{}.jsonl.gz'.format(spider.name,
+                                       time.strftime('%Y%m%dT%H%M%S'))
+        self.spool = SpoolWriter(os.path.join(self.directory, name),
+                                 batch_size=self.batch_size,
+                                 batch_interval=self.batch_interval)
+
+    def close_spider(self, spider):  # pylint: disable=unused-argument
+        """Writes the remaining rows and closes the spool."""
+
+        self.spool.close()
+        if self.stats:
+            self.stats.set_value('spool/rows_written', self.spool.rows_written)
+            self.stats.set_value('spool/path', self.spool.path)
+
+    def process_item(self, item, spider):  # pylint: disable=unused-argument
+        """Appends the row of the given item to the spool."""
+
+        if 'sql_row' in dir(item):
+            self.spool.write(item.sql_table, item.sql_row())
+        return item
@@ -1,30 +1,559 @@
 """Defines pipelines to write items to a SQLite database."""
-import sqlite3
+import collections
+import json
+import logging
+import queue
+import threading
+import time
+from scrapy import signals
+from twisted.internet import defer
+from nfldata.common.jobs import is_resumed_crawl
+from nfldata.common.seasons import is_incremental_crawl
+from nfldata.common.sqlite import (checkpoint, connect, create_indexes,
+                                   create_staging_table, database_size,
+                                   insert_statement, primary_key_columns,
+                                   swap_in_staging_tables, table_size,
+                                   upsert_rows)
+
+# How long to wait before offering held back items to a full writer queue.
+_BACKPRESSURE_DELAY = 0.05
+
+# The upper bounds, in seconds, of the buckets of the insert and commit latency
+# histograms.
+_LATENCY_BUCKETS = (0.001, 0.01, 0.1, 1, 10)
 
 
 class SqlitePipeline:
-    """Writes the items in supported_items to a SQLite database."""
+    """Writes the items in supported_items to a SQLite database.
+
+    Rows are buffered per item class and written in batches, and the
+    transaction is committed every SQLITE_COMMIT_ROWS rows or
+    SQLITE_COMMIT_INTERVAL seconds, whichever comes first.
+
+    If SQLITE_WRITER_THREAD_ENABLED is set, the rows are handed to a dedicated
+    writer thread through a queue of at most SQLITE_WRITER_QUEUE_SIZE rows, so
+    that SQLite I/O does not block the Twisted reactor. When the queue is full,
+    items are held back until the writer catches up.
+
+    The database is opened with the SQLITE_PROFILE connection profile, and its
+    write-ahead log is checkpointed every SQLITE_CHECKPOINT_INTERVAL
+    seconds.
+
+    If SQLITE_STAGING_ENABLED is set, the rows are loaded into unindexed
+    staging tables, which all replace the live tables in one transaction once
+    the spider has closed with the finished reason. Readers keep seeing the
+    previous run's data until the whole crawl has finished. If the crawl is incremental, the staged rows
+    are merged into the live tables instead, so the seasons that were not
+    crawled are kept. If the spider closes for any other reason, the staging
+    tables are left in place, and a crawl that resumes the job in JOBDIR
+    appends to them.
+
+    Otherwise, if SQLITE_SKIP_UNCHANGED_ROWS is set, rows that are already
+    stored with the same values are not rewritten. The number of inserted,
+    updated and unchanged rows for each table is recorded in the stats.
+
+    The indexes declared in each item class's sql_indexes are created once
+    the spider has closed and the rows have been loaded.
+
+    The throughput, insert and commit latencies and growth of each table are
+    recorded in the stats, and a summary of the run is stored in the
+    crawl_runs table."""
 
-    def __init__(self):
+    def __init__(self,
+                 batch_size=500,
+                 commit_rows=10000,
+                 commit_interval=60,
+                 stats=None,
+                 writer_thread_enabled=False,
+                 writer_queue_size=10000,
+                 profile='bulk_load',
+                 checkpoint_interval=300,
+                 staging_enabled=False,
+                 skip_unchanged_rows=True,
+                 staging_keep_rows=False,
+                 staging_resume=False):
+        self.batch_size = batch_size
+        self.commit_rows = commit_rows
+        self.commit_interval = commit_interval
+        self.stats = stats
+        self.writer_thread_enabled = writer_thread_enabled
+        self.writer_queue_size = writer_queue_size
+        self.profile = profile
+        self.checkpoint_interval = checkpoint_interval
+        self.staging_enabled = staging_enabled
+        self.skip_unchanged_rows = skip_unchanged_rows
+        self.staging_keep_rows = staging_keep_rows
+        self.staging_resume = staging_resume
         self.database = None
+        self.writer = None
+        self.writer_thread = None
+        self._backlog = collections.deque()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """Creates the pipeline using the SQLITE_* settings of the crawler."""
+
+        settings = crawler.settings
+        pipeline = cls(
+            batch_size=settings.getint('SQLITE_BATCH_SIZE', 500),
+            commit_rows=settings.getint('SQLITE_COMMIT_ROWS', 10000),
+            commit_interval=settings.getfloat('SQLITE_COMMIT_INTERVAL', 60),
+            stats=crawler.stats,
+            writer_thread_enabled=settings.getbool(
+                'SQLITE_WRITER_THREAD_ENABLED', False),
+            writer_queue_size=settings.getint('SQLITE_WRITER_QUEUE_SIZE',
+                                              10000),
+            profile=settings.get('SQLITE_PROFILE', 'bulk_load'),
+            checkpoint_interval=settings.getfloat('SQLITE_CHECKPOINT_INTERVAL',
+                                                  300),
+            staging_enabled=settings.getbool('SQLITE_STAGING_ENABLED', False),
+            skip_unchanged_rows=settings.getbool('SQLITE_SKIP_UNCHANGED_ROWS',
+                                                 True),
+            staging_keep_rows=is_incremental_crawl(settings),
+            staging_resume=is_resumed_crawl(settings))
+        crawler.signals.connect(pipeline.spider_closed,
+                                signal=signals.spider_closed)
+        return pipeline
 
     def open_spider(self, spider):
         """Sets up the SQLite table to consume the items created by the
         spider."""
 
-        self.database = sqlite3.connect('nfldata.sqlite')
+        # The connection is handed off to the writer thread once the tables
+        # are created, and is only ever used by one thread at a time.
+        self.database = connect(
+            self.profile, check_same_thread=not self.writer_thread_enabled)
         if 'create_table' in dir(spider):
             spider.create_table(self.database)
+        self.writer = SqliteWriter(self.database,
+                                   batch_size=self.batch_size,
+                                   commit_rows=self.commit_rows,
+                                   commit_interval=self.commit_interval,
+                                   checkpoint_interval=self.checkpoint_interval,
+                                   staging_enabled=self.staging_enabled,
+                                   staging_keep_rows=self.staging_keep_rows,
+                                   staging_resume=self.staging_resume,
+                                   skip_unchanged_rows=self.skip_unchanged_rows,
+                                   stats=self.stats,
+                                   run_name=spider.name)
+        if self.writer_thread_enabled:
+            self.database.commit()
+            self.writer_thread = SqliteWriterThread(self.writer,
+                                                    self.writer_queue_size,
+                                                    stats=self.stats)
+            self.writer_thread.start()
 
     def close_spider(self, spider):  # pylint: disable=unused-argument
-        """Commits all of the changes made to the database."""
+        """Writes any buffered rows, and commits them."""
+
+        if self.writer_thread:
+            self.writer_thread.close()
+        else:
+            self.writer.commit()
+
+    def spider_closed(self, spider, reason):  # pylint: disable=unused-argument
+        """Swaps in the staging tables if the spider finished, creates the
+        declared indexes and closes the database.
+
+        This waits for the spider_closed signal, because close_spider is not
+        told why the spider closed."""
+
+        if self.writer is not None:
+            self.writer.close(swap_staging_tables=reason == 'finished')
+
+    def process_item(self, item, spider):  # pylint: disable=unused-argument
+        """Buffers the given item to be written to SQLite."""
+
+        if 'sql_row' not in dir(item):
+            return item
+
+        if not self.writer_thread:
+            self.writer.write(type(item), item.sql_row())
+            return item
+
+        # Keep items in order behind any that are already waiting for room in
+        # the queue.
+        if not self._backlog and self.writer_thread.offer(
+                type(item), item.sql_row()):
+            return item
+
+        deferred = defer.Deferred()
+        self._backlog.append((item, deferred))
+        if len(self._backlog) == 1:
+            self._schedule_drain()
+        if self.stats:
+            self.stats.inc_value('sqlite/writer/backpressure')
+        return deferred
+
+    def _drain_backlog(self):
+        while self._backlog:
+            item, deferred = self._backlog[0]
+            try:
+                accepted = self.writer_thread.offer(type(item), item.sql_row())
+            except Exception:  # pylint: disable=broad-except
+                self._backlog.popleft()
+                deferred.errback()
+                continue
+
+            if not accepted:
+                self._schedule_drain()
+                return
+            self._backlog.popleft()
+            deferred.callback(item)
+
+    def _schedule_drain(self):
+        from twisted.internet import reactor  # pylint: disable=import-outside-toplevel
+        reactor.callLater(_BACKPRESSURE_DELAY, self._drain_backlog)
+
+
+class SqliteWriter:
+    """Buffers rows per item class, and writes them to a SQLite database with
+    executemany once a buffer holds batch_size rows. After a commit, the
+    write-ahead log is checkpointed if checkpoint_interval seconds have passed
+    since the last checkpoint.
+
+    If staging_enabled is set, each table's rows are written to a staging
+    table, which is swapped in for the table when the writer is closed. If
+    staging_keep_rows is also set, the table's existing rows are kept unless
+    they were staged again. If staging_resume is set, the staging tables left
+    behind by a writer that was closed without swapping them in are appended
+    to.
+    Otherwise, if skip_unchanged_rows is set, rows are upserted by primary key
+    and rows that have not changed are left alone.
+
+    The time spent inserting each table's rows and committing is recorded in
+    latency histograms in the stats. If run_name is given, a summary of the
+    run is stored in the crawl_runs table when the writer is closed."""
+
+    def __init__(self,
+                 database,
+                 batch_size,
+                 commit_rows,
+                 commit_interval,
+                 checkpoint_interval=300,
+                 staging_enabled=False,
+                 skip_unchanged_rows=False,
+                 stats=None,
+                 staging_keep_rows=False,
+                 staging_resume=False,
+                 run_name=None):
+        self.database = database
+        self.batch_size = batch_size
+        self.commit_rows = commit_rows
+        self.commit_interval = commit_interval
+        self.checkpoint_interval = checkpoint_interval
+        self.staging_enabled = staging_enabled
+        self.staging_keep_rows = staging_keep_rows
+        self.staging_resume = staging_resume
+        self.skip_unchanged_rows = skip_unchanged_rows
+        self.stats = stats
+        self.run_name = run_name
+        self._buffers = {}
+        self._staging_tables = {}
+        self._primary_keys = {}
+        self._item_classes = set()
+        self._uncommitted_rows = 0
+        self._last_commit = time.monotonic()
+        self._last_checkpoint = time.monotonic()
+        self._started = time.monotonic()
+        self._started_at = time.time()
+        self._item_counts = collections.Counter()
+        self._rows_written = collections.Counter()
+        self._insert_seconds = collections.Counter()
+        self._commit_seconds = 0
+        self._commits = 0
+        self._database_size = database_size(database)
+        self._table_sizes = {}
+
+    def write(self, item_class, row):
+        """Buffers a single row for the table of the given item class, flushing
+        and committing if any of the limits have been reached."""
+
+        buffer = self._buffers.setdefault(item_class, [])
+        buffer.append(row)
+        self._uncommitted_rows += 1
+        self._item_counts[item_class.sql_table] += 1
+
+        if len(buffer) >= self.batch_size:
+            self._flush(item_class)
+        self.commit_if_due()
+
+    def commit_if_due(self):
+        """Commits if there are at least commit_rows uncommitted rows, or if the
+        last commit was more than commit_interval seconds ago."""
+
+        if not self._uncommitted_rows:
+            return
+        if (self._uncommitted_rows >= self.commit_rows or
+                time.monotonic() - self._last_commit >= self.commit_interval):
+            self.commit()
+
+    def flush(self):
+        """Writes all of the buffered rows to the database without
+        committing."""
 
+        for item_class in list(self._buffers):
+            self._flush(item_class)
+
+    def commit(self):
+        """Writes all of the buffered rows and commits them."""
+
+        self.flush()
+        started = time.monotonic()
         self.database.commit()
+        self._uncommitted_rows = 0
+        self._last_commit = time.monotonic()
+        self._commit_seconds += self._last_commit - started
+        self._commits += 1
+        if self.stats:
+            self.stats.inc_value('sqlite/commits')
+            self._record_latency('sqlite/commit_latency',
+                                 self._last_commit - started)
+
+        if time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+            self._checkpoint('PASSIVE')
+
+    def close(self, swap_staging_tables=True):
+        """Commits the remaining rows, swaps in any staging tables, creates the
+        declared indexes, records the run, truncates the write-ahead log and
+        closes the database.
+
+        If swap_staging_tables is not set, the staging tables are kept as they
+        are, and the live tables are left alone."""
+
+        self.commit()
+        if self._staging_tables and swap_staging_tables:
+            swap_in_staging_tables(self.database,
+                                   self._staging_tables,
+                                   keep_rows=self.staging_keep_rows)
+            if self.stats:
+                self.stats.inc_value('sqlite/staging/swapped_tables',
+                                     len(self._staging_tables))
+        elif self._staging_tables:
+            logging.info('Keeping %s until a crawl finishes',
+                         ', '.join(self._staging_tables.values()))
+            if self.stats:
+                self.stats.inc_value('sqlite/staging/kept_tables',
+                                     len(self._staging_tables))
+        for item_class in self._item_classes:
+            create_indexes(self.database, item_class.sql_table,
+                           getattr(item_class, 'sql_indexes', ()))
+        self._record_run()
+        self.database.commit()
+        self._checkpoint('TRUNCATE')
         self.database.close()
 
-    def process_item(self, item, spider):  # pylint: disable=unused-argument
-        """Writes the given item to SQLite."""
+    def _table_for(self, item_class):
+        table = item_class.sql_table
+        if not self.staging_enabled:
+            return table
+
+        if table not in self._staging_tables:
+            self._staging_tables[table] = create_staging_table(
+                self.database, table, resume=self.staging_resume)
+        return self._staging_tables[table]
+
+    def _checkpoint(self, mode):
+        checkpoint(self.database, mode)
+        self._last_checkpoint = time.monotonic()
+        if self.stats:
+            self.stats.inc_value('sqlite/checkpoints')
+
+    def _flush(self, item_class):
+        rows = self._buffers.pop(item_class, None)
+        if not rows:
+            return
+
+        if item_class not in self._item_classes:
+            self._item_classes.add(item_class)
+            self._table_sizes[item_class.sql_table] = table_size(
+                self.database, item_class.sql_table)
+
+        started = time.monotonic()
+        self._write_rows(item_class, rows)
+        seconds = time.monotonic() - started
+        self._insert_seconds[item_class.sql_table] += seconds
+        if self.stats:
+            self._record_latency(
+                f'sqlite/insert_latency/{item_class.sql_table}', seconds)
+
+    def _write_rows(self, item_class, rows):
+        table = self._table_for(item_class)
+        if self.staging_enabled or not self.skip_unchanged_rows:
+            self.database.executemany(
+                insert_statement(table, item_class.sql_columns), rows)
+            self._inc_table_stat('rows_written', item_class, len(rows))
+            return
+
+        if table not in self._primary_keys:
+            self._primary_keys[table] = primary_key_columns(
+                self.database, table)
+        inserted, updated = upsert_rows(self.database, table,
+                                        item_class.sql_columns,
+                                        self._primary_keys[table], rows)
+        self._inc_table_stat('rows_written', item_class, inserted + updated)
+        self._inc_table_stat('rows_inserted', item_class, inserted)
+        self._inc_table_stat('rows_updated', item_class, updated)
+        self._inc_table_stat('rows_unchanged', item_class,
+                             len(rows) - inserted - updated)
+
+    def _inc_table_stat(self, name, item_class, count):
+        if name == 'rows_written':
+            self._rows_written[item_class.sql_table] += count
+        if self.stats:
+            self.stats.inc_value(f'sqlite/{name}/{item_class.sql_table}', count)
+
+    def _record_latency(self, name, seconds):
+        bucket = next(
+            (f'le_{bound}s' for bound in _LATENCY_BUCKETS if seconds <= bound),
+            'gt_{}s'.format(_LATENCY_BUCKETS[-1]))
+        self.stats.inc_value(f'{name}/{bucket}')
+        self.stats.max_value(f'{name}/max_seconds', seconds)
+
+    def _record_run(self):
+        elapsed = time.monotonic() - self._started
+        tables = {}
+        for table, items in self._item_counts.items():
+            size_before = self._table_sizes.get(table)
+            size_after = table_size(self.database, table)
+            tables[table] = {
+                'items': items,
+                'items_per_second': items / elapsed if elapsed else None,
+                'rows_written': self._rows_written[table],
+                'insert_seconds': self._insert_seconds[table],
+                'bytes_before': size_before,
+                'bytes_after': size_after,
+            }
+            if self.stats:
+                self.stats.set_value(f'sqlite/items_per_second/{table}',
+                                     tables[table]['items_per_second'])
+                if size_before is not None and size_after is not None:
+                    self.stats.set_value(f'sqlite/bytes_growth/{table}',
+                                         size_after - size_before)
+
+        size_after = database_size(self.database)
+        items = sum(self._item_counts.values())
+        items_per_second = items / elapsed if elapsed else None
+        if self.stats:
+            self.stats.set_value('sqlite/items_per_second', items_per_second)
+            self.stats.set_value('sqlite/database_bytes', size_after)
+            self.stats.set_value('sqlite/database_bytes_growth',
+                                 size_after - self._database_size)
+
+        if not self.run_name:
+            return
+        self.database.execute('''
+            CREATE TABLE IF NOT EXISTS crawl_runs (
+                run_id INTEGER PRIMARY KEY,
+                run TEXT,
+                started_at TEXT,
+                finished_at TEXT,
+                elapsed_seconds REAL,
+                items INTEGER,
+                items_per_second REAL,
+                rows_written INTEGER,
+                insert_seconds REAL,
+                commits INTEGER,
+                commit_seconds REAL,
+                database_bytes_before INTEGER,
+                database_bytes_after INTEGER,
+                tables TEXT
+            )
+        ''')
+        self.database.execute(
+            '''
+            INSERT INTO crawl_runs (
+                run, started_at, finished_at, elapsed_seconds, items,
+                items_per_second, rows_written, insert_seconds, commits,
+                commit_seconds, database_bytes_before, database_bytes_after,
+                tables
+            ) VALUES (?, datetime(?, 'unixepoch'), datetime('now'), ?, ?, ?, ?, ?,
+                      ?, ?, ?, ?, ?)
+        ''',
+            (self.run_name, self._started_at, elapsed, items, items_per_second,
+             sum(self._rows_written.values()), sum(
+                 self._insert_seconds.values()), self._commits,
+             self._commit_seconds, self._database_size, size_after,
+             json.dumps(tables)))
+
+
+class SqliteWriterThread(threading.Thread):
+    """Runs a SqliteWriter on its own thread, which is fed rows through a
+    bounded queue.
+
+    The queue depth and the writer lag, which is the time between a row being
+    queued and being written, are recorded in the stats under sqlite/writer."""
+
+    _STOP = object()
+
+    def __init__(self, writer, queue_size, stats=None):
+        super().__init__(name='SqliteWriterThread', daemon=True)
+        self.writer = writer
+        self.stats = stats
+        self.error = None
+        self._queue = queue.Queue(maxsize=queue_size)
+
+    def offer(self, item_class, row):
+        """Queues a single row without blocking. Returns False if the queue is
+        full, and raises the writer's error if it has failed."""
+
+        if self.error:
+            raise self.error
+
+        try:
+            self._queue.put_nowait((time.monotonic(), item_class, row))
+        except queue.Full:
+            return False
+
+        if self.stats:
+            depth = self._queue.qsize()
+            self.stats.set_value('sqlite/writer/queue_depth', depth)
+            self.stats.max_value('sqlite/writer/max_queue_depth', depth)
+        return True
+
+    def close(self):
+        """Waits for the queue to drain, and then commits the rows. The writer
+        is then only used by the calling thread."""
+
+        self._queue.put(self._STOP)
+        self.join()
+        if self.error:
+            raise self.error
+
+    def run(self):
+        try:
+            self._write_rows()
+        except Exception as error:  # pylint: disable=broad-except
+            logging.exception('SQLite writer thread failed')
+            self.error = error
+            # Keep draining so that nothing blocks on a full queue.
+            while self._queue.get() is not self._STOP:
+                pass
+            return
+
+        # The queue has already been drained up to _STOP by now.
+        try:
+            self.writer.commit()
+        except Exception as error:  # pylint: disable=broad-except
+            logging.exception('SQLite writer thread failed to commit')
+            self.error = error
+
+    def _write_rows(self):
+        while True:
+            try:
+                entry = self._queue.get(timeout=self.writer.commit_interval)
+            except queue.Empty:
+                self.writer.commit_if_due()
+                continue
+
+            if entry is self._STOP:
+                return
 
-        if 'sql_insert' in dir(item):
-            item.sql_insert(self.database)
-        return item
+            queued_at, item_class, row = entry
+            self.writer.write(item_class, row)
+            if self.stats:
+                lag = time.monotonic() - queued_at
+                self.stats.set_value('sqlite/writer/lag_seconds', lag)
+                self.stats.max_value('sqlite/writer/max_lag_seconds', lag)
+                self.stats.set_value('sqlite/writer/queue_depth',
+                                     self._queue.qsize())
@@ -58,6 +58,10 @@ SPIDER_MIDDLEWARES = {
 # Enable or disable downloader middlewares
 # See https://doc.scrapy.org/en/latest/topics/downloader-middleware.html
 DOWNLOADER_MIDDLEWARES = {
+    'nfldata.common.pfr.PfrDirectMiddleware':
+        720,
+    'nfldata.common.splash.SplashPoolMiddleware':
+        722,
     'scrapy_splash.SplashCookiesMiddleware':
         723,
     'scrapy_splash.SplashMiddleware':
@@ -66,18 +70,81 @@ DOWNLOADER_MIDDLEWARES = {
         810,
     'scrapy.downloadermiddlewares.retry.RetryMiddleware':
         820,
+    'scrapy.downloadermiddlewares.httpcache.HttpCacheMiddleware':
+        None,
+    'nfldata.common.httpcache.ConditionalCacheMiddleware':
+        900,
+    'nfldata.common.httpcache.SplashRevalidationMiddleware':
+        950,
 }
 RETRY_TIMES = 3
 
 # Enable or disable extensions
 # See https://doc.scrapy.org/en/latest/topics/extensions.html
-#EXTENSIONS = {
-#    'scrapy.extensions.telnet.TelnetConsole': None,
-#}
+EXTENSIONS = {
+    'nfldata.common.jobs.CrawlProgress': 500,
+}
+# Log the number of completed and pending requests every this many seconds (0
+# to disable). With JOBDIR set, the progress is also saved there for
+# scripts/spider.py.
+CRAWL_PROGRESS_INTERVAL = 60
+# Save the requests waiting in the scheduler under JOBDIR, including the ones
+# whose callbacks are functions instead of spider methods, so that an
+# interrupted crawl can be resumed.
+SCHEDULER_DISK_QUEUE = 'nfldata.common.jobs.CallbackPathDiskQueue'
 
 # Configure item pipelines
 # See https://doc.scrapy.org/en/latest/topics/item-pipeline.html
-ITEM_PIPELINES = {'nfldata.pipelines.sqlite.SqlitePipeline': 300}
+ITEM_PIPELINES = {
+    'nfldata.pipelines.spool.SpoolPipeline': 100,
+    'nfldata.pipelines.parquet.ParquetExportPipeline': 200,
+    'nfldata.pipelines.sqlite.SqlitePipeline': 300,
+}
+# The number of rows of a single table to buffer before writing them with
+# executemany.
+SQLITE_BATCH_SIZE = 500
+# Commit after this many rows or this many seconds, whichever comes first, so
+# that a failed crawl only loses the rows since the last commit.
+SQLITE_COMMIT_ROWS = 10000
+SQLITE_COMMIT_INTERVAL = 60
+# Write to SQLite from a dedicated thread instead of the Twisted reactor. Items
+# are held back while the writer's queue is full.
+SQLITE_WRITER_THREAD_ENABLED = False
+SQLITE_WRITER_QUEUE_SIZE = 10000
+# The connection profile from nfldata.common.sqlite.SQLITE_PROFILES that the
+# spiders use, and how often to checkpoint the write-ahead log.
+SQLITE_PROFILE = 'bulk_load'
+SQLITE_CHECKPOINT_INTERVAL = 300
+# Load each run into unindexed staging tables, which replace the live tables
+# once the spider finishes. Any rows the spider does not emit are dropped,
+# unless the crawl is incremental, in which case the staged rows are merged in.
+# If the spider stops early, the staging tables are kept for a resumed crawl.
+SQLITE_STAGING_ENABLED = False
+# Upsert rows by primary key, and skip rows whose values have not changed since
+# the last crawl instead of deleting and reinserting them.
+SQLITE_SKIP_UNCHANGED_ROWS = True
+# Only crawl the seasons from CRAWL_FIRST_SEASON onwards. Otherwise, if
+# INCREMENTAL_CRAWL_ENABLED is set, only crawl from the latest season in the
+# teams table, less INCREMENTAL_CRAWL_LOOKBACK_SEASONS, onwards. Historic
+# seasons do not change, so they do not need to be crawled again.
+CRAWL_FIRST_SEASON = None
+INCREMENTAL_CRAWL_ENABLED = False
+INCREMENTAL_CRAWL_LOOKBACK_SEASONS = 0
+# The years of the drafts to crawl, e.g. scrapy crawl draft_picks -s
+# DRAFT_FIRST_YEAR=2015.
+DRAFT_FIRST_YEAR = 1936
+DRAFT_LAST_YEAR = 2019
+# Export the tables written by each spider to Parquet once it closes.
+PARQUET_EXPORT_ENABLED = False
+PARQUET_EXPORT_DIRECTORY = 'parquet'
+# Append every item to a compressed spool on disk before it is stored, so that
+# a crashed crawl can be loaded with nfldata.analysis.replay instead of crawled
+# again. The spool is fsynced every SPOOL_BATCH_SIZE items or
+# SPOOL_BATCH_INTERVAL seconds.
+SPOOL_ENABLED = False
+SPOOL_DIRECTORY = 'spool'
+SPOOL_BATCH_SIZE = 1000
+SPOOL_BATCH_INTERVAL = 5
 
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://doc.scrapy.org/en/latest/topics/autothrottle.html
@@ -102,5 +169,29 @@ HTTPCACHE_DIR = 'httpcache'
 HTTPCACHE_IGNORE_HTTP_CODES = [503, 504, 505, 500, 400, 401, 402, 403, 404]
 
 SPLASH_URL = 'http://localhost:8050'
-DUPEFILTER_CLASS = 'scrapy_splash.SplashAwareDupeFilter'
-HTTPCACHE_STORAGE = 'scrapy_splash.SplashAwareFSCacheStorage'
+# Spread Splash requests across these Splash instances instead of only using
+# SPLASH_URL, for example ['http://localhost:8050', 'http://localhost:8051'].
+# An instance is taken out of the pool after SPLASH_POOL_MAX_FAILURES failures
+# in a row. Every instance is pinged every SPLASH_POOL_HEALTH_CHECK_INTERVAL
+# seconds. One that does not answer within SPLASH_POOL_HEALTH_CHECK_TIMEOUT
+# seconds is taken out of the pool until it answers again.
+SPLASH_POOL_URLS = []
+SPLASH_POOL_MAX_FAILURES = 3
+SPLASH_POOL_HEALTH_CHECK_INTERVAL = 30
+SPLASH_POOL_HEALTH_CHECK_TIMEOUT = 10
+# Filter duplicate requests with a Bloom filter in JOBDIR sized for
+# DUPEFILTER_BLOOM_CAPACITY requests, and look up the ones it may have seen in
+# an exact store on disk.
+DUPEFILTER_CLASS = 'nfldata.common.dupefilter.BloomDupeFilter'
+DUPEFILTER_BLOOM_CAPACITY = 10000000
+DUPEFILTER_BLOOM_ERROR_RATE = 0.001
+# Keep every cached response in one SQLite database under HTTPCACHE_DIR, and
+# evict the least recently used ones once it holds more than
+# HTTPCACHE_SQLITE_MAX_SIZE bytes (0 for no limit).
+HTTPCACHE_STORAGE = 'nfldata.common.httpcache.SqliteCacheStorage'
+HTTPCACHE_SQLITE_MAX_SIZE = 0
+# Revalidate responses older than HTTPCACHE_EXPIRATION_SECS with conditional
+# requests instead of fetching them in full again. Cached responses are only
+# deleted once they are HTTPCACHE_SQLITE_EXPIRATION_SECS old (0 for never).
+HTTPCACHE_POLICY = 'nfldata.common.httpcache.ConditionalCachePolicy'
+HTTPCACHE_SQLITE_EXPIRATION_SECS = 0
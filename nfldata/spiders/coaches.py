@@ -1,12 +1,12 @@
 """Defines spiders related to NFL coaches."""
-import re
-import numpy as np
 import scrapy
-from nfldata.common.pfr import pfr_request, PRO_FOOTBALL_REFERENCE_DOMAIN
+from nfldata.common.pfr import (parse_team_meta, pfr_request, stats_table_rows,
+                                team_season_links,
+                                PRO_FOOTBALL_REFERENCE_DOMAIN)
+from nfldata.common.seasons import first_season_to_crawl
+from nfldata.common.splash import render_profile
 from nfldata.items.coaches import Coach, CoachingPosition, CoachingStaffMember, coaching_position_from_string
 
-COACHES_POSITION_REGEX = re.compile(r'\((.+)\)')
-
 
 class CoachesSpider(scrapy.Spider):
     """The spider that crawls and stores information about NFL coaches."""
@@ -24,10 +24,8 @@ class CoachesSpider(scrapy.Spider):
         return [pfr_request('coaches')]
 
     def parse(self, response):  # pylint: disable=arguments-differ
-        for row in response.css('table#coaches tbody tr:not(.thead)'):
-            coach = row.css('td[data-stat="coach"] a::attr(href)').get()
-            name = row.css('td[data-stat="coach"] a::text').get()
-            yield Coach(coach=coach, name=name)
+        for row in stats_table_rows(response, 'coaches'):
+            yield Coach(coach=row['coach'].link, name=row['coach'].link_text)
 
 
 class CoachingStaffMembersSpider(scrapy.Spider):
@@ -39,6 +37,10 @@ class CoachingStaffMembersSpider(scrapy.Spider):
     name = 'coaching_staffs'
     allowed_domains = [PRO_FOOTBALL_REFERENCE_DOMAIN]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.first_season = None
+
     @classmethod
     def create_table(cls, database):
         """Create the table needed for this spider."""
@@ -46,53 +48,53 @@ class CoachingStaffMembersSpider(scrapy.Spider):
         CoachingStaffMember.sql_create(database)
 
     def start_requests(self):
+        self.first_season = first_season_to_crawl(self.settings)
         return [pfr_request('teams')]
 
     def parse(self, response):  # pylint: disable=arguments-differ
         for link in response.css(
                 'th[data-stat=team_name] a::attr(href)').getall():
-            yield pfr_request(link, callback=parse_franchise)
+            yield pfr_request(link,
+                              meta={'first_season': self.first_season},
+                              callback=parse_franchise)
 
 
+@render_profile('franchise')
 def parse_franchise(response):
     """Follow the links to all of the teams for this franchise."""
 
-    for link in response.css('th[data-stat=year_id] a::attr(href)').getall():
+    for _, link in team_season_links(response,
+                                     response.meta.get('first_season')):
         yield pfr_request(link, meta={'team': link}, callback=parse_coaches)
 
 
-def parse_coaches(response):
-    """Parse the coaches from a team's page."""
+@render_profile('team_season')
+def parse_coaches(response, team_meta=None):
+    """Parse the coaches from a team's page. team_meta is the page's TeamMeta,
+    if it has already been parsed."""
 
-    coach = response.xpath("//p[contains(., 'Coach:')]/a/@href").get()
+    if team_meta is None:
+        team_meta = parse_team_meta(response)
     team = response.meta['team']
-    yield CoachingStaffMember(coach=coach,
+    yield CoachingStaffMember(coach=team_meta.head_coach,
                               team=team,
                               position=CoachingPosition.HEAD_COACH)
 
-    offensive_coordinator = response.xpath(
-        "//p[contains(., 'Offensive Coordinator:')]/a/@href").get()
-    if offensive_coordinator:
+    if team_meta.offensive_coordinator:
         yield CoachingStaffMember(
-            coach=offensive_coordinator,
+            coach=team_meta.offensive_coordinator,
             team=team,
             position=CoachingPosition.OFFENSIVE_COORDINATOR)
 
-    defensive_coordinator = response.xpath(
-        "//p[contains(., 'Defensive Coordinator:')]/a/@href").get()
-    if defensive_coordinator:
+    if team_meta.defensive_coordinator:
         yield CoachingStaffMember(
-            coach=defensive_coordinator,
+            coach=team_meta.defensive_coordinator,
             team=team,
             position=CoachingPosition.DEFENSIVE_COORDNATOR)
 
-    assistant_coaches = response.xpath(
-        "//p[contains(., 'Other Notable Asst')]/a/@href").getall()
-    if assistant_coaches is not None and len(assistant_coaches) > 0:
-        positions = response.xpath(
-            "//p[contains(., 'Other Notable Asst')]/text()").getall()
-        positions = np.hstack(
-            [COACHES_POSITION_REGEX.findall(p) for p in positions])
+    assistant_coaches = team_meta.assistant_coaches
+    if assistant_coaches:
+        positions = team_meta.assistant_positions
         if len(assistant_coaches) != len(positions):
             raise ValueError(
                 f'different number of assistant coaches ({assistant_coaches}) and positions ({positions}) found'
@@ -1,6 +1,8 @@
 """ Defines spiders related to the NFL draft."""
 import scrapy
-from nfldata.common.pfr import pfr_request, PRO_FOOTBALL_REFERENCE_DOMAIN
+from nfldata.common.pfr import (pfr_request, stats_table_rows,
+                                PRO_FOOTBALL_REFERENCE_DOMAIN)
+from nfldata.common.seasons import first_season_to_crawl
 from nfldata.items.draft import DraftPick, DraftType
 
 
@@ -18,13 +20,20 @@ class DraftPicksSpider(scrapy.Spider):
         DraftPick.sql_create(database)
 
     def start_requests(self):
-        return [create_request(year) for year in range(1936, 2020)]
+        first_year = self.settings.getint('DRAFT_FIRST_YEAR', 1936)
+        last_year = self.settings.getint('DRAFT_LAST_YEAR', 2019)
+        first_season = first_season_to_crawl(self.settings)
+        if first_season is not None:
+            first_year = max(first_year, first_season)
+        return [
+            create_request(year) for year in range(first_year, last_year + 1)
+        ]
 
     def parse(self, response):  # pylint: disable=arguments-differ
-        for row in response.css('table#drafts tbody tr:not(.thead)'):
+        for row in stats_table_rows(response, 'drafts'):
             yield parse_item(response.meta['year'], DraftType.NORMAL, row)
 
-        for row in response.css('table#drafts_supp tbody tr:not(.thead)'):
+        for row in stats_table_rows(response, 'drafts_supp'):
             yield parse_item(response.meta['year'], DraftType.SUPPLEMENTAL, row)
 
 
@@ -34,39 +43,40 @@ def create_request(year):
     return pfr_request('years/{}/draft.htm'.format(year), meta={'year': year})
 
 
-def parse_int(row, css, invalid_value):
-    """Parses an int from the given row using the css selector. Returns
+def parse_int(row, stat, invalid_value):
+    """Parses an int from the cell of the given row with the data-stat. Returns
     invalid_value if there is no value."""
 
-    result = row.css(css).get()
-    if result:
-        return int(result)
+    cell = row.get(stat)
+    if cell and cell.text:
+        return int(cell.text)
     return invalid_value
 
 
+def parse_link_or_text(row, stat):
+    """Returns the link in the cell of the given row with the data-stat, or its
+    text if it has no link."""
+
+    cell = row.get(stat)
+    if cell is None:
+        return None
+    return cell.link or cell.text
+
+
 def parse_item(year, draft_type, row):
-    """Parses the given row out into a DraftPick item."""
-
-    draft_round = parse_int(row, 'th[data-stat="draft_round"]::text', -1)
-    draft_pick = parse_int(row, 'td[data-stat="draft_pick"]::text', -1)
-    franchise = '/'.join(
-        row.css('td[data-stat="team"] a::attr(href)').get().split('/')[:-1])
-
-    player = row.css('td[data-stat="player"] a::attr(href)').get()
-    if not player:
-        player = row.css('td[data-stat="player"]::text').get()
-
-    position = row.css('td[data-stat="pos"]::text').get()
-    age = parse_int(row, 'td[data-stat="age"]::text', -1)
-    first_team_all_pros = parse_int(
-        row, 'td[data-stat="all_pros_first_team"]::text', 0)
-    pro_bowls = parse_int(row, 'td[data-stat="pro_bowls"]::text', 0)
-    career_approx_value = parse_int(row, 'td[data-stat="career_av"]::text', 0)
-    draft_approx_value = parse_int(row, 'td[data-stat="draft_av"]::text', 0)
-
-    college = row.css('td[data-stat="college_id"] a::attr(href)').get()
-    if not college:
-        college = row.css('td[data-stat="college_id"]::text').get()
+    """Parses the given row of stats_table_rows out into a DraftPick item."""
+
+    draft_round = parse_int(row, 'draft_round', -1)
+    draft_pick = parse_int(row, 'draft_pick', -1)
+    franchise = '/'.join(row['team'].link.split('/')[:-1])
+    player = parse_link_or_text(row, 'player')
+    position = row['pos'].text if 'pos' in row else None
+    age = parse_int(row, 'age', -1)
+    first_team_all_pros = parse_int(row, 'all_pros_first_team', 0)
+    pro_bowls = parse_int(row, 'pro_bowls', 0)
+    career_approx_value = parse_int(row, 'career_av', 0)
+    draft_approx_value = parse_int(row, 'draft_av', 0)
+    college = parse_link_or_text(row, 'college_id')
 
     return DraftPick(year=year,
                      draft_type=draft_type,
@@ -1,6 +1,8 @@
 """Defines spiders related to NFL executives."""
 import scrapy
-from nfldata.common.pfr import pfr_request, PRO_FOOTBALL_REFERENCE_DOMAIN
+from nfldata.common.pfr import (pfr_request, stats_table_rows,
+                                PRO_FOOTBALL_REFERENCE_DOMAIN)
+from nfldata.common.splash import render_profile
 from nfldata.items.executives import Executive, FrontOfficeMember
 
 
@@ -19,10 +21,9 @@ class ExecutivesSpider(scrapy.Spider):
         return [pfr_request('executives')]
 
     def parse(self, response):  # pylint: disable=arguments-differ
-        for row in response.css('table#executives tbody tr:not(.thead)'):
-            executive = row.css('th[data-stat=exec] a::attr(href)').get()
-            name = row.css('th[data-stat=exec] a::text').get()
-            yield Executive(executive=executive, name=name)
+        for row in stats_table_rows(response, 'executives'):
+            yield Executive(executive=row['exec'].link,
+                            name=row['exec'].link_text)
 
 
 class FrontOfficeMembersSpider(scrapy.Spider):
@@ -32,6 +33,9 @@ class FrontOfficeMembersSpider(scrapy.Spider):
     name = 'front_office_members'
     allowed_domains = [PRO_FOOTBALL_REFERENCE_DOMAIN]
 
+    # Executive pages list their jobs in the raw HTML.
+    pfr_direct = True
+
     @classmethod
     def create_table(cls, database):
         """Create the table needed for this spider."""
@@ -41,18 +45,19 @@ class FrontOfficeMembersSpider(scrapy.Spider):
         return [pfr_request('executives')]
 
     def parse(self, response):  # pylint: disable=arguments-differ
-        for row in response.css('table#executives tbody tr:not(.thead)'):
-            link = row.css('th[data-stat=exec] a::attr(href)').get()
+        for row in stats_table_rows(response, 'executives'):
+            link = row['exec'].link
             yield pfr_request(link,
                               meta={'executive': link},
                               callback=parse_executive)
 
 
+@render_profile('executive')
 def parse_executive(response):
     """Parse the executive's jobs from their page."""
 
-    for row in response.css('table#exec_results tbody tr:not(.thead)'):
+    for row in stats_table_rows(response, 'exec_results'):
         executive = response.meta['executive']
-        team = row.css('td[data-stat=team] a::attr(href)').get()
-        title = row.css('td[data-stat=job_title]::text').get()
+        team = row['team'].link
+        title = row['job_title'].text
         yield FrontOfficeMember(executive=executive, team=team, title=title)
@@ -1,11 +1,20 @@
 """Defines spiders related to player injuries."""
+import functools
 import re
 import scrapy
-from nfldata.common.pfr import pfr_request, PRO_FOOTBALL_REFERENCE_DOMAIN
+from nfldata.common.pfr import (pfr_request, stats_table_rows,
+                                team_season_links,
+                                PRO_FOOTBALL_REFERENCE_DOMAIN)
+from nfldata.common.seasons import first_season_to_crawl
+from nfldata.common.splash import render_profile
 from nfldata.items.injuries import (Injury, InjuryReason, InjuryStatus,
                                     InjuryOutcome, InjuryType,
                                     PFR_INJURY_REASON_SUBSTITUTIONS)
 
+# The number of distinct injury report tips whose status and reasons are kept.
+# The same few thousand tips repeat across every team season.
+INJURY_TIP_CACHE_SIZE = 4096
+
 
 class InjuriesSpider(scrapy.Spider):
     """The spider that crawls and stores all of the injuries that players have
@@ -14,6 +23,14 @@ class InjuriesSpider(scrapy.Spider):
     name = 'injuries'
     allowed_domains = [PRO_FOOTBALL_REFERENCE_DOMAIN]
 
+    # Injury reports are served in the HTML of the page, so they do not have
+    # to be rendered.
+    pfr_direct = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.first_season = None
+
     @classmethod
     def create_table(cls, database):
         """Create the table needed for this spider."""
@@ -22,14 +39,23 @@ class InjuriesSpider(scrapy.Spider):
         InjuryReason.sql_create(database)
 
     def start_requests(self):
+        self.first_season = first_season_to_crawl(self.settings)
         return [pfr_request('teams')]
 
     def parse(self, response):  #pylint: disable=arguments-differ
         for link in response.css(
                 'th[data-stat=team_name] a::attr(href)').getall():
-            yield pfr_request(link, callback=parse_franchise)
+            yield pfr_request(link,
+                              meta={'first_season': self.first_season},
+                              callback=parse_franchise)
 
+    def closed(self, reason):  # pylint: disable=unused-argument
+        """Records how well the injury report tips were cached."""
 
+        record_injury_tip_stats(self.crawler.stats)
+
+
+@render_profile('franchise')
 def parse_franchise(response):
     """Follow the links to all of the teams for this franchise."""
 
@@ -41,12 +67,12 @@ def parse_team_links(response):
     """Parse the links to individual teams from a franchise page to get injury
     reports."""
 
-    years = response.css('th[data-stat=year_id] a::text').getall()
-    links = response.css('th[data-stat=year_id] a::attr(href)').getall()
     # Injury reports are only available from 2009 onwards.
-    return [link for year, link in zip(years, links) if int(year) >= 2009]
+    first_season = max(2009, response.meta.get('first_season') or 2009)
+    return [link for _, link in team_season_links(response, first_season)]
 
 
+@render_profile('team_season')
 def parse_team(response):
     """Follow link for this team's roster."""
 
@@ -56,37 +82,64 @@ def parse_team(response):
                       callback=parse_injuries)
 
 
+@render_profile('injuries')
 def parse_injuries(response):
     """Parse and yield Injury items for each injury report."""
 
-    for row in response.css('table#team_injuries tbody tr:not(.thead)'):
-        player = row.css('[data-stat=player] a::attr(href)').get()
+    for row in stats_table_rows(response, 'team_injuries'):
+        player = row['player'].link
         team = response.meta['team']
-        for column in [c for c in row.css('td') if c.css('::text').get()]:
-            week = parse_week(column)
-            status = parse_status(column)
+        for stat, column in row.items():
+            if not stat.startswith('week_') or not column.text:
+                continue
+            week = parse_week(stat)
+            status, reasons = decode_injury_tip(
+                column.attributes.get('data-tip'))
             yield Injury(player=player,
                          team=team,
                          week=week,
                          status=status,
                          outcome=parse_outcome(column))
 
-            for reason in parse_reasons(status, column):
+            for reason in reasons:
                 yield InjuryReason(player=player,
                                    team=team,
                                    week=week,
                                    reason=reason)
 
 
-def parse_week(column):
-    """Parse the week number of the given injury report column."""
+def parse_week(stat):
+    """Parse the week number of the given injury report column's data-stat."""
+
+    return int(stat.lstrip('week_'))
+
+
+@functools.lru_cache(maxsize=INJURY_TIP_CACHE_SIZE)
+def decode_injury_tip(tip):
+    """Returns the status and the tuple of reasons of an injury report column
+    from its data-tip.
+
+    The results are cached. Errors are not, so a tip with an unknown status or
+    reason raises every time it is seen."""
+
+    status = parse_status(tip)
+    return status, tuple(parse_reasons(status, tip))
+
+
+def record_injury_tip_stats(stats):
+    """Records the hits, misses and hit rate of decode_injury_tip."""
 
-    week = column.css('::attr(data-stat)').get()
-    return int(week.lstrip('week_'))
+    info = decode_injury_tip.cache_info()
+    stats.set_value('injuries/tip_cache/hits', info.hits)
+    stats.set_value('injuries/tip_cache/misses', info.misses)
+    stats.set_value('injuries/tip_cache/size', info.currsize)
+    if info.hits + info.misses:
+        stats.set_value('injuries/tip_cache/hit_rate',
+                        info.hits / (info.hits + info.misses))
 
 
-def parse_reasons(status, column):
-    """Parse the injury type of the given injury report column."""
+def parse_reasons(status, tip):
+    """Parse the injury type of the given injury report column's data-tip."""
 
     if status == InjuryStatus.SUSPENDED:
         return [InjuryType.SUSPENSION]
@@ -95,7 +148,7 @@ def parse_reasons(status, column):
     elif status == InjuryStatus.RESERVE_OR_FUTURE:
         return [InjuryType.NOT_INJURY_RELATED]
 
-    reasons = column.css('::attr(data-tip)').get()
+    reasons = tip
     if reasons == None or reasons == '':
         return [InjuryType.UNDISCLOSED]
     _, reasons = reasons.split(':')
@@ -118,11 +171,10 @@ def parse_reason(reason):
     return [InjuryType[reason]]
 
 
-def parse_status(column):
-    """Parse the status of the given injury report column."""
+def parse_status(tip):
+    """Parse the status of the given injury report column's data-tip."""
 
-    status = column.css('::attr(data-tip)').get()
-    raw_status, _ = status.split(':')
+    raw_status, _ = tip.split(':')
     status = raw_status.strip().upper().replace(' ', '_')
 
     if status == 'RESERVE/FUTURE':
@@ -140,7 +192,7 @@ def parse_outcome(column):
     """Parse whether the player played or not from the given injury report
     column."""
 
-    classes = column.css('::attr(class)').get().split(' ')
+    classes = column.attributes['class'].split(' ')
 
     if 'dnp' in classes:
         return InjuryOutcome.DID_NOT_PLAY
@@ -2,6 +2,7 @@
 import re
 import scrapy
 from nfldata.common.pfr import pfr_request, PRO_FOOTBALL_REFERENCE_DOMAIN
+from nfldata.common.splash import render_profile
 from nfldata.items.players import (Player, PlayerType, PlayerPosition,
                                    PFR_POSITION_CODES_TRANSLATIONS)
 
@@ -28,6 +29,7 @@ class PlayersSpider(scrapy.Spider):
             yield pfr_request(link, callback=parse_players)
 
 
+@render_profile('players')
 def parse_players(response):
     """Parses a page of players into many Player items."""
 
@@ -35,6 +37,7 @@ def parse_players(response):
         yield pfr_request(link, meta={'player': link}, callback=parse_player)
 
 
+@render_profile('player')
 def parse_player(response):
     """Parse player details from a single player's profile."""
 
@@ -1,6 +1,10 @@
 """Defines spiders related to NFL rosters."""
 import scrapy
-from nfldata.common.pfr import pfr_request, PRO_FOOTBALL_REFERENCE_DOMAIN
+from nfldata.common.pfr import (pfr_request, stats_table_rows,
+                                team_season_links,
+                                PRO_FOOTBALL_REFERENCE_DOMAIN)
+from nfldata.common.seasons import first_season_to_crawl
+from nfldata.common.splash import render_profile
 from nfldata.items.rosters import RosterMember
 
 
@@ -11,6 +15,13 @@ class RosterMembersSpider(scrapy.Spider):
     name = 'roster_members'
     allowed_domains = [PRO_FOOTBALL_REFERENCE_DOMAIN]
 
+    # The roster table is in the raw HTML, so Splash is not needed.
+    pfr_direct = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.first_season = None
+
     @classmethod
     def create_table(cls, database):
         """Create the table needed for this spider."""
@@ -18,21 +29,27 @@ class RosterMembersSpider(scrapy.Spider):
         RosterMember.sql_create(database)
 
     def start_requests(self):
+        self.first_season = first_season_to_crawl(self.settings)
         return [pfr_request('teams')]
 
     def parse(self, response):  # pylint: disable=arguments-differ
         for link in response.css(
                 'th[data-stat=team_name] a::attr(href)').getall():
-            yield pfr_request(link, callback=parse_franchise)
+            yield pfr_request(link,
+                              meta={'first_season': self.first_season},
+                              callback=parse_franchise)
 
 
+@render_profile('franchise')
 def parse_franchise(response):
     """Follow the links to all of the teams for this franchise."""
 
-    for link in response.css('th[data-stat=year_id] a::attr(href)').getall():
+    for _, link in team_season_links(response,
+                                     response.meta.get('first_season')):
         yield pfr_request(link, meta={'team': link}, callback=parse_team)
 
 
+@render_profile('team_season')
 def parse_team(response):
     """Follow link for this team's roster."""
 
@@ -42,15 +59,17 @@ def parse_team(response):
                       callback=parse_roster)
 
 
+@render_profile('roster')
 def parse_roster(response):
     """Parse all of the player rows in this roster."""
 
-    for row in response.css('table#games_played_team tbody tr:not(.thead)'):
-        player = row.css('[data-stat="player"] a::attr(href)').get()
+    for row in stats_table_rows(response, 'games_played_team'):
+        player = row['player'].link
         team = response.meta['team']
-        approximate_value = row.css('[data-stat="av"]::text').get()
+        approximate_value = row['av'].text if 'av' in row else None
         approximate_value = int(approximate_value) if approximate_value else 0
-        awards = row.css('[data-stat="player"]::text').get()
+        # The awards are marked after the player's link.
+        awards = row['player'].text
         pro_bowl = awards is not None and '*' in awards
         first_team_all_pro = awards is not None and '+' in awards
         yield RosterMember(player=player,
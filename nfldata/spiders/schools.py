@@ -1,6 +1,7 @@
 """Defines spiders related to schools that NFL players have attended."""
 import scrapy
-from nfldata.common.pfr import pfr_request, PRO_FOOTBALL_REFERENCE_DOMAIN
+from nfldata.common.pfr import (pfr_request, stats_table_rows,
+                                PRO_FOOTBALL_REFERENCE_DOMAIN)
 from nfldata.items.schools import School
 
 
@@ -21,9 +22,7 @@ class SchoolsSpider(scrapy.Spider):
         return [pfr_request('schools')]
 
     def parse(self, response):  # pylint: disable=arguments-differ
-        for row in response.css(
-                'table#college_stats_table tbody tr:not(.thead)'):
-            school = row.css('td[data-stat="college_name"] a::attr(href)').get()
-            if school:
-                name = row.css('td[data-stat="college_name"] a::text').get()
-                yield School(school=school, name=name)
+        for row in stats_table_rows(response, 'college_stats_table'):
+            cell = row.get('college_name')
+            if cell and cell.link:
+                yield School(school=cell.link, name=cell.link_text)
@@ -1,8 +1,12 @@
 import logging
 import scrapy
-from nfldata.common.pfr import pfr_request, PRO_FOOTBALL_REFERENCE_DOMAIN
+from nfldata.common.pfr import (parse_team_meta, pfr_request, stats_table_rows,
+                                PRO_FOOTBALL_REFERENCE_DOMAIN)
+from nfldata.common.seasons import first_season_to_crawl
+from nfldata.common.splash import render_profile
+from nfldata.common.sqlite import connect, table_exists, DATABASE_PATH
 from nfldata.common.usgs import usgs_geonames_request, USGS_GEONAMES_DOMAIN
-from nfldata.common.address import parse_address
+from nfldata.common.address import AddressNormalizer
 from nfldata.items.stadiums import Stadium, StadiumMember
 
 
@@ -12,6 +16,12 @@ class StadiumsSpider(scrapy.Spider):
     name = 'stadiums'
     allowed_domains = [PRO_FOOTBALL_REFERENCE_DOMAIN]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.first_season = None
+        self.stadium_resolver = StadiumResolver.from_database(
+            self.parse_stadium_address)
+
     @classmethod
     def create_table(cls, database):
         """Create the table needed for this spider."""
@@ -19,6 +29,7 @@ class StadiumsSpider(scrapy.Spider):
         StadiumMember.sql_create(database)
 
     def start_requests(self):
+        self.first_season = first_season_to_crawl(self.settings)
         return [pfr_request('teams')]
 
     def parse(self, response):  # pylint: disable=arguments-differ
@@ -27,47 +38,147 @@ class StadiumsSpider(scrapy.Spider):
             if franchise.endswith('/'):
                 franchise = franchise[:-1]
             yield pfr_request(franchise,
-                              meta={'franchise': franchise},
-                              callback=parse_teams_for_franchise)
-
-
-def parse_teams_for_franchise(response):
-    """Parses all of the teams in a single franchises."""
-
-    for row in response.css('table#team_index tr[data-row]:not(.thead)'):
-        team = row.css('td[data-stat="team"] a::attr(href)').get()
-        yield pfr_request(team, meta={'team': team}, callback=parse_stadium)
+                              meta={
+                                  'franchise': franchise,
+                                  'first_season': self.first_season
+                              },
+                              callback=self.parse_teams_for_franchise)
+
+    @render_profile('franchise')
+    def parse_teams_for_franchise(self, response):
+        """Parses all of the teams in a single franchises."""
+
+        first_season = response.meta.get('first_season')
+        for row in stats_table_rows(response, 'team_index'):
+            year = int(row['year_id'].link_text)
+            if first_season is not None and year < first_season:
+                continue
+            team = row['team'].link
+            yield pfr_request(team,
+                              meta={'team': team},
+                              callback=self.parse_team)
+
+    @render_profile('team_season')
+    def parse_team(self, response):
+        """Resolves the stadium of a single team."""
+
+        yield from parse_stadium(response, self.stadium_resolver)
+
+    @render_profile('stadium')
+    def parse_stadium_address(self, response):
+        """Parses a stadium page into a Stadium."""
+
+        yield from self.stadium_resolver.parse_stadium_address(response)
+
+    def closed(self, reason):  # pylint: disable=unused-argument
+        """Saves the new stadium addresses, and records how well they were
+        cached."""
+
+        self.stadium_resolver.normalizer.save()
+        self.stadium_resolver.normalizer.record_stats(self.crawler.stats)
+
+
+class StadiumResolver:
+    """Produces a Stadium for each stadium that the teams play at, fetching each
+    stadium page at most once.
+
+    The stadiums already in the database are not fetched again. The teams'
+    StadiumMember items do not need the stadium page, so parse_stadium yields
+    them straight from the team pages."""
+
+    def __init__(self, callback, stadiums=None, normalizer=None):
+        self.callback = callback
+        self.normalizer = normalizer or AddressNormalizer()
+        # The Stadium of each resolved stadium link, or None if its page has no
+        # address.
+        self.stadiums = dict(stadiums or {})
+        # The stadium pages that have been requested in this crawl.
+        self.requested = set()
+        # The stadiums that have been produced in this crawl.
+        self.produced = set()
 
-
-def parse_stadium(response):
+    @classmethod
+    def from_database(cls, callback):
+        """Creates a resolver with the stadiums and addresses stored by earlier
+        crawls. Stadium pages are parsed by the given callback."""
+
+        normalizer = AddressNormalizer(DATABASE_PATH)
+        database = connect('read_heavy')
+        try:
+            if not table_exists(database, Stadium.sql_table):
+                return cls(callback, normalizer=normalizer)
+            rows = database.execute(
+                f'SELECT {", ".join(Stadium.sql_columns)} FROM {Stadium.sql_table}'
+            ).fetchall()
+        finally:
+            database.close()
+        return cls(
+            callback,
+            {row[0]: Stadium(zip(Stadium.sql_columns, row)) for row in rows},
+            normalizer)
+
+    def resolve(self, stadium):
+        """Yields the Stadium if it is known, or a request for the stadium page
+        if nobody has requested it yet."""
+
+        if stadium in self.stadiums:
+            yield from self._produce(stadium)
+        elif stadium not in self.requested:
+            self.requested.add(stadium)
+            yield pfr_request(stadium,
+                              meta={'stadium': stadium},
+                              callback=self.callback)
+
+    @render_profile('stadium')
+    def parse_stadium_address(self, response):
+        """Parses a stadium page, and yields its Stadium."""
+
+        stadium = response.meta['stadium']
+        self.stadiums[stadium] = parse_stadium_address(response,
+                                                       self.normalizer)
+        yield from self._produce(stadium)
+
+    def _produce(self, stadium):
+        item = self.stadiums[stadium]
+        # The stadiums table is rebuilt by every crawl, so each stadium is
+        # produced once even if it was stored by an earlier one.
+        if item is not None and stadium not in self.produced:
+            self.produced.add(stadium)
+            yield item
+
+
+def parse_stadium(response, resolver, team_meta=None):
+    """Yields the StadiumMember of a team's page, and resolves its stadium with
+    the given StadiumResolver. team_meta is the page's TeamMeta, if it has
+    already been parsed."""
+
+    if team_meta is None:
+        team_meta = parse_team_meta(response)
     team = response.meta['team']
-    stadium = response.xpath("//p[contains(., 'Stadium:')]/a/@href").get()
+    stadium = team_meta.stadium
     if stadium:
-        yield pfr_request(stadium,
-                          meta={
-                              'team': team,
-                              'stadium': stadium
-                          },
-                          callback=parse_stadium_address)
+        yield StadiumMember(stadium=stadium, team=team)
+        yield from resolver.resolve(stadium)
     else:
         logging.warning(f'No stadium found for {team}')
 
 
-def parse_stadium_address(response):
+def parse_stadium_address(response, normalizer):
+    """Parses a stadium page into a Stadium, or returns None if it has no
+    address. The address is parsed by the given AddressNormalizer."""
+
     name = response.css('#meta h1[itemprop="name"]::text').get().rstrip(
         ' History')
 
     address = response.css('#meta p::text').get()
     if not address.strip():
-        return
-
-    address = parse_address(address)
-    stadium = response.meta['stadium']
-    yield Stadium(stadium=stadium,
-                  name=name,
-                  city=address.city,
-                  state=address.state)
-    yield StadiumMember(stadium=stadium, team=response.meta['team'])
+        return None
+
+    address = normalizer.normalize(address)
+    return Stadium(stadium=response.meta['stadium'],
+                   name=name,
+                   city=address.city,
+                   state=address.state)
 
 
 class CityElevationsSpider(scrapy.Spider):
@@ -0,0 +1,136 @@
+"""Defines a spider that crawls every team season once for all of the spiders
+that start from the list of franchises."""
+import scrapy
+from nfldata.common.pfr import (parse_team_meta, pfr_request, team_season_links,
+                                PRO_FOOTBALL_REFERENCE_DOMAIN)
+from nfldata.common.seasons import first_season_to_crawl
+from nfldata.common.splash import render_profile
+from nfldata.items.coaches import CoachingStaffMember
+from nfldata.items.injuries import Injury, InjuryReason
+from nfldata.items.rosters import RosterMember
+from nfldata.items.stadiums import Stadium, StadiumMember
+from nfldata.items.teams import Franchise, Team
+from nfldata.spiders import coaches, injuries, rosters, stadiums, teams
+
+# The outputs of the spider, named after the spiders they replace, and the item
+# classes each of them produces.
+TEAM_SEASON_OUTPUTS = {
+    'franchises': (Franchise,),
+    'teams': (Team,),
+    'coaching_staffs': (CoachingStaffMember,),
+    'stadiums': (Stadium, StadiumMember),
+    'roster_members': (RosterMember,),
+    'injuries': (Injury, InjuryReason),
+}
+
+# Injury reports are only available from this season onwards.
+FIRST_INJURY_REPORT_SEASON = 2009
+
+
+class TeamSeasonsSpider(scrapy.Spider):
+    """The spider that walks from each franchise to each of its team seasons
+    once, and produces the items of the franchises, teams, coaching_staffs,
+    stadiums, roster_members and injuries spiders from the shared pages.
+
+    Only the roster, injury report and stadium pages are fetched on top of the
+    team season pages. To produce only some of the outputs, pass them as a
+    comma separated list:
+
+        scrapy crawl team_seasons -a outputs=teams,injuries"""
+
+    name = 'team_seasons'
+    allowed_domains = [PRO_FOOTBALL_REFERENCE_DOMAIN]
+
+    def __init__(self, *args, outputs=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.first_season = None
+        self.stadium_resolver = None
+        if outputs:
+            self.outputs = set(outputs.split(','))
+        else:
+            self.outputs = set(TEAM_SEASON_OUTPUTS)
+        unknown_outputs = self.outputs - set(TEAM_SEASON_OUTPUTS)
+        if unknown_outputs:
+            raise ValueError(
+                f'Unknown outputs: {", ".join(sorted(unknown_outputs))}')
+        if 'stadiums' in self.outputs:
+            self.stadium_resolver = stadiums.StadiumResolver.from_database(
+                self.parse_stadium_address)
+
+    def create_table(self, database):
+        """Create the tables needed for the selected outputs."""
+
+        for output in self.outputs:
+            for item_class in TEAM_SEASON_OUTPUTS[output]:
+                item_class.sql_create(database)
+
+    def start_requests(self):
+        self.first_season = first_season_to_crawl(self.settings)
+        return [pfr_request('teams')]
+
+    def parse(self, response):  # pylint: disable=arguments-differ
+        for row in response.css('th[data-stat="team_name"] a'):
+            franchise = row.css('::attr(href)').get()
+            if franchise.endswith('/'):
+                franchise = franchise[:-1]
+            if 'franchises' in self.outputs:
+                yield Franchise(franchise=franchise,
+                                name=row.css('::text').get())
+            if self.outputs - {'franchises'}:
+                yield pfr_request(franchise,
+                                  meta={
+                                      'franchise': franchise,
+                                      'first_season': self.first_season
+                                  },
+                                  callback=self.parse_franchise)
+
+    @render_profile('franchise')
+    def parse_franchise(self, response):
+        """Parses the teams of a single franchise, and follows the links to
+        each of them."""
+
+        if 'teams' in self.outputs:
+            yield from teams.parse_teams_for_franchise(response)
+
+        if not self.outputs - {'franchises', 'teams'}:
+            return
+        for year, link in team_season_links(response, self.first_season):
+            yield pfr_request(link,
+                              meta={
+                                  'team': link,
+                                  'year': year
+                              },
+                              callback=self.parse_team)
+
+    @render_profile('team_season')
+    def parse_team(self, response):
+        """Parses the coaching staff of a single team season, and follows the
+        links to its stadium, roster and injury report."""
+
+        team_meta = parse_team_meta(response)
+        if 'coaching_staffs' in self.outputs:
+            yield from coaches.parse_coaches(response, team_meta)
+        if 'stadiums' in self.outputs:
+            yield from stadiums.parse_stadium(response, self.stadium_resolver,
+                                              team_meta)
+        if 'roster_members' in self.outputs:
+            yield from rosters.parse_team(response)
+        if ('injuries' in self.outputs and
+                response.meta['year'] >= FIRST_INJURY_REPORT_SEASON):
+            yield from injuries.parse_team(response)
+
+    @render_profile('stadium')
+    def parse_stadium_address(self, response):
+        """Parses a stadium page into a Stadium."""
+
+        yield from self.stadium_resolver.parse_stadium_address(response)
+
+    def closed(self, reason):  # pylint: disable=unused-argument
+        """Saves the new stadium addresses, and records how well they and the
+        injury report tips were cached."""
+
+        if 'injuries' in self.outputs:
+            injuries.record_injury_tip_stats(self.crawler.stats)
+        if self.stadium_resolver is not None:
+            self.stadium_resolver.normalizer.save()
+            self.stadium_resolver.normalizer.record_stats(self.crawler.stats)
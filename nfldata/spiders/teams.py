@@ -1,6 +1,9 @@
 """Defines the spiders related to NFL teams"""
 import scrapy
-from nfldata.common.pfr import pfr_request, PRO_FOOTBALL_REFERENCE_DOMAIN
+from nfldata.common.pfr import (pfr_request, stats_table_rows,
+                                PRO_FOOTBALL_REFERENCE_DOMAIN)
+from nfldata.common.seasons import first_season_to_crawl
+from nfldata.common.splash import render_profile
 from nfldata.items.teams import Franchise, Team
 
 
@@ -34,12 +37,17 @@ class TeamsSpider(scrapy.Spider):
     name = 'teams'
     allowed_domains = [PRO_FOOTBALL_REFERENCE_DOMAIN]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.first_season = None
+
     @classmethod
     def create_table(cls, database):
         """Create the table needed for this spider."""
         Team.sql_create(database)
 
     def start_requests(self):
+        self.first_season = first_season_to_crawl(self.settings)
         return [pfr_request('teams')]
 
     def parse(self, response):  # pylint: disable=arguments-differ
@@ -48,26 +56,32 @@ class TeamsSpider(scrapy.Spider):
             if franchise.endswith('/'):
                 franchise = franchise[:-1]
             yield pfr_request(franchise,
-                              meta={'franchise': franchise},
+                              meta={
+                                  'franchise': franchise,
+                                  'first_season': self.first_season
+                              },
                               callback=parse_teams_for_franchise)
 
 
+@render_profile('franchise')
 def parse_teams_for_franchise(response):
     """Parses all of the teams in a single franchise into Team items."""
 
-    for row in response.css('table#team_index tr[data-row]:not(.thead)'):
-        team = row.css('td[data-stat="team"] a::attr(href)').get()
-        year = int(row.css('th[data-stat="year_id"] a::text').get())
-        name = row.css('td[data-stat="team"] a::text').get()
+    first_season = response.meta.get('first_season')
+    for row in stats_table_rows(response, 'team_index'):
+        team = row['team'].link
+        year = int(row['year_id'].link_text)
+        if first_season is not None and year < first_season:
+            continue
+        name = row['team'].link_text
         franchise = response.meta['franchise']
-        regular_season_wins = int(row.css('td[data-stat="wins"]::text').get())
-        regular_season_losses = int(
-            row.css('td[data-stat="losses"]::text').get())
+        regular_season_wins = int(row['wins'].text)
+        regular_season_losses = int(row['losses'].text)
 
         # Some tables do not have a ties column if there were no ties that year.
-        regular_season_ties = row.css('td[data-stat="ties"]::text').get()
-        if regular_season_ties:
-            regular_season_ties = int(regular_season_ties)
+        regular_season_ties = row.get('ties')
+        if regular_season_ties and regular_season_ties.text:
+            regular_season_ties = int(regular_season_ties.text)
         else:
             regular_season_ties = 0
 
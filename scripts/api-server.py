@@ -28,6 +28,6 @@ else:
     sqlite_path = Path(os.getcwd()) / 'nfldata.sqlite'
     subprocess.call([
         'docker', 'run', '--publish', '5000:5000', '-v',
-        f'{sqlite_path}:/usr/src/app/nfldata.sqlite', '--name',
-        'nfldata-api', 'nfldata-api:local'
+        f'{sqlite_path}:/usr/src/app/nfldata.sqlite', '--name', 'nfldata-api',
+        'nfldata-api:local'
     ])
@@ -25,7 +25,7 @@ while getopts "s:" OPTION; do
 done
 
 if [ ${#spiders[@]} -eq 0 ]; then
-  spiders=(franchises teams stadiums schools executives front_office_members coaches coaching_staffs players roster_members injuries draft_picks)
+  spiders=(team_seasons schools executives front_office_members coaches players draft_picks)
 fi
 
 # Scrape data from the internet using Scrapy.
@@ -1,13 +1,24 @@
 #!/usr/bin/env python3
 import subprocess
 import argparse
+import json
 import os
+import shutil
+import time
 
 parser = argparse.ArgumentParser(description='run a scrapy spider')
 parser.add_argument('spider', type=str)
 parser.add_argument('--dev',
                     default=False,
                     action=argparse.BooleanOptionalAction)
+parser.add_argument('--resume',
+                    default=False,
+                    action=argparse.BooleanOptionalAction,
+                    help='continue the last interrupted crawl of the spider')
+parser.add_argument('--progress-interval',
+                    type=float,
+                    default=60,
+                    help='seconds between progress reports')
 
 args = parser.parse_args()
 
@@ -15,16 +26,77 @@ if not args.spider:
     print('Please specify a spider')
     exit(1)
 
-try:
-    os.remove(f'logfiles/{args.spider}.log')
-except FileNotFoundError:
-    print(f'No log file found for {args.spider}')
+# The requests, seen fingerprints and progress of a crawl are kept here until
+# it finishes, so that it can be resumed with --resume.
+jobdir = f'.scrapy/jobs/{args.spider}'
+progress_path = os.path.join(jobdir, 'progress.json')
+
+
+def read_progress():
+    try:
+        with open(progress_path) as progress_file:
+            return json.load(progress_file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+resume = args.resume
+if resume:
+    progress = read_progress()
+    if not os.path.exists(jobdir):
+        print(f'No crawl to resume in {jobdir}, starting a new one')
+        resume = False
+    elif progress and progress.get('finished'):
+        # Every request of a finished crawl has been seen, so resuming it would
+        # filter them all out and do nothing.
+        print(f'The crawl saved in {jobdir} already finished, starting a new '
+              'one')
+        resume = False
+    else:
+        print(f'Resuming the crawl saved in {jobdir}')
+
+if not resume:
+    try:
+        os.remove(f'logfiles/{args.spider}.log')
+    except FileNotFoundError:
+        print(f'No log file found for {args.spider}')
+    shutil.rmtree(jobdir, ignore_errors=True)
+
+crawl_args = [
+    'nfldata-env/bin/scrapy', 'crawl', '--logfile',
+    f'logfiles/{args.spider}.log', '-s', f'JOBDIR={jobdir}', '-s',
+    f'CRAWL_PROGRESS_INTERVAL={args.progress_interval}', args.spider
+]
+
+
+def print_progress():
+    progress = read_progress()
+    if progress is None:
+        return
+    print(f'{args.spider}: {progress["completed"]} requests completed, '
+          f'{progress["pending"]} pending, {progress["items"]} items')
+
+
+def run(command):
+    process = subprocess.Popen(command)
+    try:
+        while True:
+            try:
+                process.wait(timeout=args.progress_interval)
+                break
+            except subprocess.TimeoutExpired:
+                print_progress()
+    except KeyboardInterrupt:
+        print(f'Stopping {args.spider}, run it again with --resume to '
+              'continue from here')
+        # Scrapy saves the pending requests to JOBDIR as it shuts down.
+        process.wait()
+    print_progress()
+    return process.returncode
+
 
 if args.dev:
-    subprocess.call([
-        'nfldata-env/bin/scrapy', 'crawl', '--logfile',
-        f'logfiles/{args.spider}.log', args.spider
-    ])
+    run(crawl_args)
 else:
     subprocess.call(['docker', 'stop', 'nfldata-spider'])
     subprocess.call(['docker', 'rm', 'nfldata-spider'])
@@ -32,12 +104,11 @@ else:
         'docker', 'builder', '--tag', 'nfldata-spider:local', '--file',
         'containers/spider.Dockerfile'
     ])
-    subprocess.call([
+    run([
         'docker', 'run', '--net', 'host', '-v',
         '$(pwd)/nfldata.sqlite:/usr/src/app/nfldata.sqlite', '-v',
         '$(pwd)/logfiles:/usr/src/app/logfiles', '-v',
         '$(pwd)/.scrapy:/usr/src/app/.scrapy', '--env',
         'NFLDATA_USER_AGENT=nfldata (pradyothkukkapalli.com)',
-        'nfldata-spider:local', 'nfldata-env/bin/scrapy', 'crawl', '--logfile',
-        f'logfiles/{args.spider}.log', args.spider
-    ])
+        'nfldata-spider:local'
+    ] + crawl_args)
@@ -0,0 +1,46 @@
+"""Tests for nfldata.analysis.reparse."""
+# pylint: disable=protected-access
+import json
+import unittest
+import zlib
+from nfldata.analysis import reparse
+from nfldata.spiders.coaches import CoachingStaffMembersSpider
+from nfldata.spiders.injuries import InjuriesSpider
+from nfldata.spiders.rosters import RosterMembersSpider
+from nfldata.spiders.teams import TeamsSpider
+
+TEAMS_INDEX = b'''
+<html><body><table id="teams_active"><tbody><tr>
+<th data-stat="team_name"><a href="/teams/nwe/">New England Patriots</a></th>
+</tr></tbody></table></body></html>
+'''
+
+
+def cached_response(callback, url, body, meta=None):
+    """Returns a row of cached_responses for the given page."""
+
+    return (callback, url, json.dumps(meta or {}), 200,
+            b'Content-Type: text/html; charset=utf-8\r\n', zlib.compress(body))
+
+
+class ParseCachedResponseTest(unittest.TestCase):
+    """Runs spider callbacks the way the reparse worker processes do."""
+
+    def test_callbacks_reading_first_season(self):
+        # These callbacks read the first season that start_requests sets in a
+        # crawl, which never runs when reparsing.
+        for spidercls in (InjuriesSpider, RosterMembersSpider, TeamsSpider,
+                          CoachingStaffMembersSpider):
+            with self.subTest(spider=spidercls.name):
+                reparse._init_worker(spidercls, {})
+                results = reparse.parse_cached_response(
+                    cached_response(
+                        'parse',
+                        'https://www.pro-football-reference.com/teams/',
+                        TEAMS_INDEX))
+                # The requests the callback follows are not reparsed.
+                self.assertEqual(results, [])
+
+
+if __name__ == '__main__':
+    unittest.main()